@@ -0,0 +1,89 @@
+"""partition_klines_by_month
+
+Revision ID: 9b1e7c3a5d20
+Revises: 4dc2110ffdea
+Create Date: 2026-10-18 10:12:45.318402
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b1e7c3a5d20"
+down_revision: Union[str, Sequence[str], None] = "4dc2110ffdea"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONED_TABLES = ["klines_1s", "klines_1m"]
+
+# creates one partition per month (UTC) holding klines of the old table. Months are timestamps without time zone on
+# UTC, so adding '1 month' doesn't depend on the TimeZone of the session.
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp;
+    last_month timestamp;
+BEGIN
+    SELECT date_trunc('month', to_timestamp(min(open_time) / 1000.0) AT TIME ZONE 'UTC'),
+           date_trunc('month', to_timestamp(max(open_time) / 1000.0) AT TIME ZONE 'UTC')
+    INTO month, last_month FROM {table}_old;
+
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+            '{table}_' || to_char(month, '"y"YYYY"m"MM'),
+            (extract(epoch FROM month) * 1000)::bigint,
+            (extract(epoch FROM month + interval '1 month') * 1000)::bigint
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade(engine_name: str) -> None:
+    """Upgrade schema."""
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name: str) -> None:
+    """Downgrade schema."""
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_main() -> None:
+    """Upgrade main schema."""
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS, PRIMARY KEY (ticker, open_time)) "
+            "PARTITION BY RANGE (open_time)"
+        )
+        op.execute(f"CREATE INDEX ix_{table}_open_time_brin ON {table} USING brin (open_time)")
+        op.execute(CREATE_PARTITIONS.format(table=table))
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+        op.execute(f"DROP TABLE {table}_old")
+
+
+def downgrade_main() -> None:
+    """Downgrade main schema."""
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+        op.execute(f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS, PRIMARY KEY (ticker, open_time))")
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+        # dropping the partitioned table also drops its partitions.
+        op.execute(f"DROP TABLE {table}_old")
+
+
+def upgrade_vector() -> None:
+    """Upgrade vector schema."""
+    pass
+
+
+def downgrade_vector() -> None:
+    """Downgrade vector schema."""
+    pass
@@ -0,0 +1,88 @@
+"""symbols_dictionary
+
+Revision ID: c4a8f2d91b37
+Revises: 9b1e7c3a5d20
+Create Date: 2026-10-18 14:37:02.581139
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8f2d91b37"
+down_revision: Union[str, Sequence[str], None] = "9b1e7c3a5d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KLINE_TABLES = [
+    "klines_1s",
+    "klines_1m",
+    "klines_3m",
+    "klines_5m",
+    "klines_15m",
+    "klines_30m",
+    "klines_1h",
+    "klines_2h",
+    "klines_4h",
+    "klines_6h",
+    "klines_8h",
+    "klines_12h",
+    "klines_1d",
+]
+
+
+def upgrade(engine_name: str) -> None:
+    """Upgrade schema."""
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name: str) -> None:
+    """Downgrade schema."""
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_main() -> None:
+    """Upgrade main schema."""
+    op.create_table(
+        "symbols",
+        sa.Column("id", sa.SmallInteger(), autoincrement=True, nullable=False),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("ticker"),
+    )
+    for table in KLINE_TABLES:
+        op.execute(f"INSERT INTO symbols (ticker) SELECT DISTINCT ticker FROM {table} ON CONFLICT (ticker) DO NOTHING")
+        op.add_column(table, sa.Column("symbol_id", sa.SmallInteger(), nullable=True))
+        op.execute(f"UPDATE {table} SET symbol_id = symbols.id FROM symbols WHERE symbols.ticker = {table}.ticker")
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.drop_column(table, "ticker")
+        op.alter_column(table, "symbol_id", nullable=False)
+        op.create_primary_key(f"{table}_pkey", table, ["symbol_id", "open_time"])
+        op.create_foreign_key(f"{table}_symbol_id_fkey", table, "symbols", ["symbol_id"], ["id"])
+
+
+def downgrade_main() -> None:
+    """Downgrade main schema."""
+    for table in KLINE_TABLES:
+        op.add_column(table, sa.Column("ticker", sa.String(), nullable=True))
+        op.execute(f"UPDATE {table} SET ticker = symbols.ticker FROM symbols WHERE symbols.id = {table}.symbol_id")
+        op.drop_constraint(f"{table}_symbol_id_fkey", table, type_="foreignkey")
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.drop_column(table, "symbol_id")
+        op.alter_column(table, "ticker", nullable=False)
+        op.create_primary_key(f"{table}_pkey", table, ["ticker", "open_time"])
+    op.drop_table("symbols")
+
+
+def upgrade_vector() -> None:
+    """Upgrade vector schema."""
+    pass
+
+
+def downgrade_vector() -> None:
+    """Downgrade vector schema."""
+    pass
@@ -4,9 +4,11 @@ from operator import itemgetter
 from typing import Any, Tuple
 
 import numpy as np
+from binance.error import ClientError
 from binance.spot import Spot
 from dotenv import load_dotenv
 
+from pycrypto.commons.rate_limiter import RateLimiter
 from pycrypto.commons.utils import BrokerUtils, Singleton, convert_any_to_timestamp
 
 # https://developers.binance.com/docs/derivatives/usds-margined-futures/market-data/rest-api/Kline-Candlestick-Data
@@ -32,18 +34,44 @@ class BinanceSpot(metaclass=Singleton):
     def __init__(self, test_mode=False):
         load_dotenv()
         self.test_mode = test_mode
-        self._client = Spot(os.environ["BINANCE_APIKEY"], os.environ["BINANCE_SECRETKEY"])
+        self._client = Spot(os.environ["BINANCE_APIKEY"], os.environ["BINANCE_SECRETKEY"], show_limit_usage=True)
+        self.limiter = RateLimiter()
         logger.info("BinanceSpot initializated.")
 
+    def _request(self, endpoint: str, **params) -> Any:
+        """Call an endpoint of binance client under the shared rate limiter.
+
+        Args:
+            endpoint: name of method on binance client, e.g. "klines".
+            params: params of method.
+
+        Returns:
+            data of response.
+
+        """
+        self.limiter.acquire(endpoint)
+        try:
+            response = getattr(self._client, endpoint)(**params)
+        except ClientError as e:
+            # 429 warns about the limit and 418 is an IP ban, both tell how long to wait on Retry-After.
+            if e.status_code in (418, 429):
+                self.limiter.block(float((e.header or {}).get("Retry-After", 60)))
+            raise
+
+        used_weight = response["limit_usage"].get("x-mbx-used-weight-1m")
+        if used_weight is not None:
+            self.limiter.sync(int(used_weight))
+        return response["data"]
+
     def wallet(self):
-        wallet = {dc["asset"]: dc["free"] for dc in self._client.user_asset()}
+        wallet = {dc["asset"]: dc["free"] for dc in self._request("user_asset")}
         logger.debug(f"{wallet=}")
         return wallet
 
     def trade_fee(self):
         try:
-            fee = self._client.trade_fee()
-            info = self._client.exchange_info()
+            fee = self._request("trade_fee")
+            info = self._request("exchange_info")
             trade_fee = {
                 d["symbol"]: {
                     "buyerFee": d["takerCommission"],
@@ -73,7 +101,8 @@ class BinanceSpot(metaclass=Singleton):
     ) -> np.ndarray | list[dict]:
         try:
             adjusted_start_time = convert_any_to_timestamp(start_time)
-            data = self._client.klines(
+            data = self._request(
+                "klines",
                 symbol=ticker,
                 interval=interval,
                 startTime=adjusted_start_time,
@@ -100,9 +129,9 @@ class BinanceSpot(metaclass=Singleton):
                 "quantity": quantity,
             }
             if self.test_mode:
-                buy_order = self._client.new_order_test(**params)
+                buy_order = self._request("new_order_test", **params)
             else:
-                buy_order = self._client.new_order(**params)
+                buy_order = self._request("new_order", **params)
 
             logger.info(f"Successful buy request for {quantity} of ticker {ticker}.")
             return buy_order
@@ -119,9 +148,9 @@ class BinanceSpot(metaclass=Singleton):
                 "quantity": quantity,
             }
             if self.test_mode:
-                sell_order = self._client.new_order_test(**params)
+                sell_order = self._request("new_order_test", **params)
             else:
-                sell_order = self._client.new_order(**params)
+                sell_order = self._request("new_order", **params)
 
             logger.info(f"Successful sell request for {quantity} of ticker {ticker}.")
             return sell_order
@@ -4,7 +4,7 @@ from typing import overload
 
 from binance.websocket.websocket_client import BinanceWebsocketClient
 
-from pycrypto.commons import Cache
+from pycrypto.commons import Cache, KlineWriter
 from pycrypto.commons.utils import Singleton
 
 # https://developers.binance.com/docs/derivatives/usds-margined-futures/websocket-market-streams/Kline-Candlestick-Streams
@@ -15,12 +15,14 @@ logger = logging.getLogger("app.websocket")
 class BinanceWebsocket(metaclass=Singleton):
     _stream: BinanceWebsocketClient = None  # type:ignore
 
-    def __init__(self, ticker="BTCUSDT", intervals=["1s", "1m", "1h"]):
+    def __init__(self, ticker="BTCUSDT", intervals=["1s", "1m", "1h"], **kwargs):
         Cache()
         self.base_url = "wss://stream.binance.com:9443"
         self.ticker = ticker
         self.intervals = intervals
         self.subscribe_list = ""
+        # klines are buffered and flushed by a background thread, keeping redis round trips out of the callbacks.
+        self.writer = KlineWriter(**kwargs.get("writer_params", {}))
 
     @property
     def stream(self):
@@ -60,7 +62,7 @@ class BinanceWebsocket(metaclass=Singleton):
         try:
             logger.debug(message)
             msg = json.loads(message)
-            Cache.append_kline(msg["stream"], msg["data"]["k"], closed_klines=msg["data"]["k"]["x"])
+            self.writer.put(msg["stream"], msg["data"]["k"], closed_klines=msg["data"]["k"]["x"])
         except Exception:
             pass
 
@@ -69,7 +71,7 @@ class BinanceWebsocket(metaclass=Singleton):
             logger.debug(message)
             msg = json.loads(message)
             stream_name = msg["s"], msg["k"]["i"]
-            Cache.append_kline(stream_name, msg["k"], closed_klines=msg["k"]["x"])
+            self.writer.put(stream_name, msg["k"], closed_klines=msg["k"]["x"])
         except Exception:
             pass
 
@@ -82,6 +84,7 @@ class BinanceWebsocket(metaclass=Singleton):
 
     def close_websocket(self):
         self._stream.stop()
+        self.writer.close()
 
     @overload
     def start_websocket(self, ticker: str, intervals: str | list): ...
@@ -107,6 +110,7 @@ class BinanceWebsocket(metaclass=Singleton):
                 string_connection = self.get_string_connection(ticker, intervals)
 
             logger.info(f"Starting websocket for ticker {ticker} with intervals {', '.join(intervals)}.")
+            self.writer.start()
             multi_klines_stream = len(intervals) > 1
 
             if multi_klines_stream:
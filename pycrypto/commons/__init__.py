@@ -1,12 +1,24 @@
+from .async_cache import AsyncCache
+from .archive import KlineArchive
+from .async_database import AsyncDatabase
 from .cache import Cache
+from .cache_writer import KlineWriter
 from .database import Database
 from .models_main import main_registry
 from .models_vector import vector_registry
+from .rate_limiter import RateLimiter
+from .ringbuffer import RingBufferStore
 from .vectordb import VectorDatabase
 
 __all__ = [
+    "AsyncCache",
+    "AsyncDatabase",
     "Cache",
     "Database",
+    "KlineArchive",
+    "KlineWriter",
+    "RateLimiter",
+    "RingBufferStore",
     "VectorDatabase",
     "main_registry",
     "vector_registry",
@@ -0,0 +1,143 @@
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pycrypto.commons.database import Database
+from pycrypto.commons.utils import BrokerUtils, convert_any_to_timestamp
+
+logger = logging.getLogger("app")
+
+
+class KlineArchive:
+    """Columnar archive of closed klines on local disk.
+
+    Klines of each (ticker, interval) are exported from `Database` into one .npy file per month
+    (e.g. BTCUSDT/1m/2025-01.npy) holding a structured array ordered by open_time. Files are memory-mapped back,
+    so reading an archived range is a file access instead of a SQL query.
+
+    Args:
+        path: directory of the archive. Defaults to env KLINES_ARCHIVE_PATH or data/archive.
+
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path or os.getenv("KLINES_ARCHIVE_PATH", "data/archive"))
+
+    def _dir(self, ticker: str, interval: str) -> Path:
+        return self.path / ticker.upper() / interval
+
+    def months(self, ticker: str, interval: str) -> list[str]:
+        """Archived months (YYYY-MM) of a ticker and interval, sorted."""
+        return sorted(file.stem for file in self._dir(ticker, interval).glob("*.npy"))
+
+    def export(
+        self,
+        ticker: str,
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+        chunk_size: int = 100_000,
+    ) -> list[str]:
+        """Export closed klines of a ticker from database, merged with months already archived.
+
+        Args:
+            ticker: ticker of klines.
+            interval: interval of klines.
+            from_datetime: single datetime on any type
+            between_datetimes: tuple of datetimes on any type
+            chunk_size: rows fetched from database at a time.
+
+        Returns:
+            list of months (YYYY-MM) written.
+
+        """
+        now = int(datetime.now().timestamp() * 1000)
+        chunks = Database().iter_klines(ticker, interval, from_datetime, between_datetimes, chunk_size=chunk_size)
+
+        written, pending, current = [], [], None
+        for chunk in chunks:
+            chunk = chunk[chunk["close_time"] < now]
+            months = chunk["open_time"].astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+            # chunks are ordered by open_time, so each month is a contiguous run.
+            for month, start in zip(*np.unique(months, return_index=True)):
+                end = np.searchsorted(months, month, side="right")
+                if current is not None and month != current:
+                    self._write(ticker, interval, current, np.concatenate(pending))
+                    written.append(current)
+                    pending = []
+                current = month
+                pending.append(chunk[start:end])
+
+        if pending:
+            self._write(ticker, interval, current, np.concatenate(pending))
+            written.append(current)
+
+        logger.info(f"Klines archived of ({ticker}, {interval}): {written}")
+        return written
+
+    def _write(self, ticker: str, interval: str, month: str, data: np.ndarray):
+        file = self._dir(ticker, interval) / f"{month}.npy"
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        if file.exists():
+            archived = np.load(file)
+            data = np.concatenate([archived, data.astype(archived.dtype)])
+            _, index = np.unique(data["open_time"][::-1], return_index=True)
+            # keeps the last version of each kline, ordered by open_time.
+            data = data[::-1][index]
+
+        # readers keep mapping the previous file until the new one replaces it.
+        tmp = file.with_name(file.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, file)
+
+    def read(
+        self,
+        ticker: str,
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+    ) -> np.ndarray:
+        """Read archived klines of a ticker ordered by open_time.
+
+        Ranges inside a single month are zero-copy views of the memory-mapped file.
+
+        Args:
+            ticker: ticker of klines.
+            interval: interval of klines.
+            from_datetime: single datetime on any type
+            between_datetimes: tuple of datetimes on any type
+
+        Returns:
+            structured array with `BrokerUtils.columns_dtype` of the archived columns, empty if nothing is archived.
+
+        """
+        start, end = None, None
+        if from_datetime != "":
+            start = convert_any_to_timestamp(from_datetime)
+        if all(between_datetimes):
+            start = convert_any_to_timestamp(between_datetimes[0])
+            end = convert_any_to_timestamp(between_datetimes[1])
+
+        months = self.months(ticker, interval)
+        if start is not None:
+            months = [m for m in months if m >= str(np.datetime64(start, "ms").astype("datetime64[M]"))]
+        if end is not None:
+            months = [m for m in months if m <= str(np.datetime64(end, "ms").astype("datetime64[M]"))]
+
+        parts = []
+        for month in months:
+            data = np.load(self._dir(ticker, interval) / f"{month}.npy", mmap_mode="r")
+            first = 0 if start is None else np.searchsorted(data["open_time"], start, side="left")
+            last = data.size if end is None else np.searchsorted(data["open_time"], end, side="right")
+            parts.append(data[first:last])
+
+        if not parts:
+            columns = [c.name for c in Database.ModelMapping[interval].__table__.columns if c.name != "symbol_id"]
+            return np.empty(0, dtype=[BrokerUtils.columns_dtype[c] for c in columns])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
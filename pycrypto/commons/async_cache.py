@@ -0,0 +1,239 @@
+import logging
+import os
+from typing import Any, AsyncIterator
+
+import numpy as np
+import redis.asyncio as aredis
+from redis.exceptions import ResponseError
+
+from pycrypto.commons.cache import Cache
+from pycrypto.commons.utils import BrokerUtils, Singleton
+
+logger = logging.getLogger("app")
+
+
+class AsyncCache(metaclass=Singleton):
+    """Asyncio flavour of `Cache` built on `redis.asyncio`.
+
+    Entries are encoded and decoded by the `Cache` helpers, so both classes read and write the same streams.
+    Every call shares the same connection pools. When `Cache.kline_backend` is set, kline calls are served by it
+    through `Cache`, as its reads and writes are local memory accesses.
+    """
+
+    _cache: aredis.Redis = None  # type: ignore
+    _raw: aredis.Redis = None  # type: ignore
+    _maxlen = BrokerUtils.websocket_opened_maxlen
+
+    def __init__(self):
+        if AsyncCache._cache is None:
+            params = {
+                "host": os.environ["REDIS_HOST"],
+                "db": 0,
+                "port": int(os.environ["REDIS_PORT"]),
+                "socket_keepalive": True,
+                "health_check_interval": 30,
+            }
+            AsyncCache._cache = aredis.Redis(connection_pool=aredis.ConnectionPool(**params, decode_responses=True))
+            AsyncCache._raw = aredis.Redis(connection_pool=aredis.ConnectionPool(**params, decode_responses=False))
+
+    @classmethod
+    async def ping(cls) -> bool:
+        return await cls._cache.ping()
+
+    @classmethod
+    async def close(cls):
+        """Release the pooled connections, which are bound to the running event loop."""
+        await cls._cache.connection_pool.disconnect()
+        await cls._raw.connection_pool.disconnect()
+
+    @classmethod
+    async def save(cls, key: str, value: Any) -> bool:
+        try:
+            await cls._cache.set(key, Cache.encode_value(value))
+            return True
+        except Exception:
+            logger.exception(f"Error on save key {key}, value {value} on redis.")
+            raise
+
+    @classmethod
+    async def save_many(cls, mapping: dict[str, Any]) -> bool:
+        try:
+            await cls._cache.mset({key: Cache.encode_value(value) for key, value in mapping.items()})
+            return True
+        except Exception:
+            logger.exception(f"Error on save keys {list(mapping)} on redis.")
+            raise
+
+    @classmethod
+    async def get(cls, key: str):
+        try:
+            return Cache.decode_value(await cls._cache.get(key))
+        except Exception:
+            logger.warning(f"Error on decode key {key}.")
+            return None
+
+    @classmethod
+    async def get_many(cls, keys: list[str]) -> dict[str, Any]:
+        try:
+            values = await cls._cache.mget(keys)
+        except Exception:
+            logger.warning(f"Error on get keys {keys}.")
+            return {key: None for key in keys}
+        return Cache.decode_values(keys, values)
+
+    @classmethod
+    async def search_keys(cls, pattern="*", _type: str | None = None) -> list[str]:
+        return [key async for key in cls.scan_keys(pattern, _type)]
+
+    @classmethod
+    async def scan_keys(cls, pattern="*", _type: str | None = None, count: int = 1000) -> AsyncIterator[str]:
+        """Same as `Cache.scan_keys`."""
+        async for key in cls._cache.scan_iter(match=pattern, count=count, _type=_type):
+            yield key
+
+    @classmethod
+    async def append_kline(cls, stream: Any, data: dict, closed_klines=True) -> bool | None:
+        if Cache.kline_backend is not None:
+            return Cache.append_kline(stream, data, closed_klines)
+
+        redis_key, interval = Cache._stream_key(stream, closed_klines)
+        try:
+            pipe = cls._cache.pipeline(transaction=False)
+            Cache._queue_kline(pipe, redis_key, interval, data, closed_klines)
+            await pipe.execute()
+            return True
+        except Exception:
+            logger.exception(f"Error on append_klines {stream}")
+            return None
+
+    @classmethod
+    async def append_klines(
+        cls, stream: Any, data: list[dict] | np.ndarray, closed_klines=True, batch_size: int = 1000
+    ) -> bool | None:
+        if Cache.kline_backend is not None:
+            return Cache.append_klines(stream, data, closed_klines)
+
+        redis_key, interval = Cache._stream_key(stream, closed_klines)
+        maxlen = cls._maxlen[interval]
+        pipe = cls._cache.pipeline(transaction=False)
+
+        try:
+            if isinstance(data, np.ndarray):
+                entries = zip(data["open_time"].tolist(), Cache.encode_klines(data))
+            else:
+                entries = ((item["open_time"], Cache.encode_kline(item)) for item in data)
+
+            for count, (open_time, fields) in enumerate(entries, start=1):
+                pipe.xadd(redis_key, fields, id=open_time, maxlen=maxlen, approximate=True)
+                if count % batch_size == 0:
+                    await pipe.execute()
+            await pipe.execute()
+            return True
+        except Exception:
+            logger.exception(f"Error on append_klines {stream}")
+            return None
+
+    @classmethod
+    async def get_klines(
+        cls,
+        ticker: str,
+        interval: str,
+        min_range="-",
+        max_range="+",
+        closed_klines=True,
+        limit=None,
+        only_columns=[],
+    ) -> np.ndarray | None:
+        """Same as `Cache.get_klines(..., as_array=True)`."""
+        if Cache.kline_backend is not None:
+            return Cache.get_klines(ticker, interval, min_range, max_range, closed_klines, limit, only_columns, True)
+
+        redis_key = f"{ticker.lower()}@kline_{interval}"
+        redis_key += ":closed" if closed_klines or interval == "1s" else ":opened"
+        try:
+            raw_data = await cls._raw.xrevrange(
+                redis_key, max=max_range, min=min_range, count=limit or cls._maxlen[interval]
+            )
+            return Cache.project_columns(Cache.decode_klines(raw_data)[::-1], only_columns)
+        except Exception:
+            logger.warning(f"Error on get_klines {redis_key}. Check if this key exists.")
+            return None
+
+    @classmethod
+    async def get_open_kline(cls, ticker: str, interval: str, as_array: bool | None = None) -> dict | np.ndarray | None:
+        """Same as `Cache.get_open_kline`."""
+        current_key = f"{ticker.lower()}@kline_{interval}:current"
+        return Cache.decode_open_kline(current_key, await cls._raw.hgetall(current_key), as_array)
+
+    @classmethod
+    async def get_klines_many(
+        cls, streams: list[tuple[str, str, int | None]], closed_klines=True, only_columns=[]
+    ) -> dict[tuple[str, str], np.ndarray]:
+        """Same as `Cache.get_klines_many`."""
+        if Cache.kline_backend is not None:
+            return Cache.get_klines_many(streams, closed_klines, only_columns)
+
+        pipe = cls._raw.pipeline(transaction=False)
+        for ticker, interval, limit in streams:
+            redis_key = f"{ticker.lower()}@kline_{interval}"
+            redis_key += ":closed" if closed_klines or interval == "1s" else ":opened"
+            pipe.xrevrange(redis_key, count=limit or cls._maxlen[interval])
+
+        try:
+            results = await pipe.execute()
+        except Exception:
+            logger.exception(f"Error on get_klines_many of {len(streams)} streams.")
+            raise
+
+        return {
+            (ticker, interval): Cache.project_columns(Cache.decode_klines(raw_data)[::-1], only_columns)
+            for (ticker, interval, _), raw_data in zip(streams, results)
+        }
+
+    @classmethod
+    async def get_info_stream(cls, ticker: str, interval: str, closed_klines=True) -> dict:
+        redis_key = f"{ticker.lower()}@kline_{interval}"
+        redis_key += ":closed" if closed_klines else ":opened"
+        try:
+            return Cache.decode_stream_info(await cls._raw.xinfo_stream(redis_key))
+        except ResponseError:
+            logger.warning(f"The key {redis_key} not exists.")
+            return {}
+        except Exception:
+            logger.exception(f"Error on get_info_stream of ticker {ticker}, interval {interval}")
+            raise
+
+    @classmethod
+    async def delete_stream(cls, ticker: str, interval: str, closed_klines=True) -> bool:
+        if Cache.kline_backend is not None:
+            return Cache.delete_stream(ticker, interval, closed_klines)
+
+        _stream = f"{ticker.lower()}@kline_{interval}"
+        _keys = [_stream + ":closed"] if closed_klines else [_stream + ":opened", _stream + ":current"]
+        _stream = _keys[0]
+        try:
+            await cls._cache.delete(*_keys)
+            Cache.l1_invalidate(_stream)
+            return True
+        except Exception:
+            logger.warning(f"Error on delete stream of ticker {ticker}, interval {interval}")
+            return False
+
+    @classmethod
+    async def check_key_exists(cls, ticker: str, interval: str, closed_klines=True) -> bool:
+        if Cache.kline_backend is not None:
+            return Cache.check_key_exists(ticker, interval, closed_klines)
+
+        redis_key = f"{ticker.lower()}@kline_{interval}"
+        redis_key += ":closed" if closed_klines else ":opened"
+        return bool(await cls._cache.exists(redis_key))
+
+    @classmethod
+    async def flushdb(cls) -> bool:
+        try:
+            await cls._cache.flushdb()
+            Cache.l1_invalidate()
+            return True
+        except Exception:
+            logger.warning("Error on flush redis.")
+            raise
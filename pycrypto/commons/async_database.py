@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from pycrypto.commons.database import Database
+from pycrypto.commons.utils import Singleton
+
+logger = logging.getLogger("app")
+
+
+class AsyncDatabase(metaclass=Singleton):
+    """Asyncio flavour of `Database` built on a psycopg async engine.
+
+    Statements are built by the `Database` helpers, so both classes query the same tables the same way.
+    """
+
+    ModelMapping = Database.ModelMapping
+
+    def __init__(self, **kwargs):
+        self.__connection_str = kwargs.get("connection_str", "")
+        configs = kwargs.get("configs", {})
+
+        if not self.__connection_str:
+            host, port, dbname, user, password = tuple(
+                map(os.getenv, ["POSTGRES_HOST", "POSTGRES_PORT", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD"])
+            )
+            self.__connection_str = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{dbname}"
+            configs = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 20}
+
+        self.__engine = create_async_engine(self.__connection_str, **configs)
+        self.__sessionmaker = async_sessionmaker(self.__engine, expire_on_commit=False)
+        self._symbols: dict[str, int] = {}
+
+    @property
+    def connection_str(self):
+        return self.__connection_str
+
+    @asynccontextmanager
+    async def session_factory(self):
+        async with self.__sessionmaker() as session:
+            yield session
+
+    async def dispose(self):
+        """Close the pooled connections, which are bound to the running event loop."""
+        await self.__engine.dispose()
+
+    async def symbol_id(self, ticker: str, create=True) -> int | None:
+        """Same as `Database.symbol_id`."""
+        if ticker in self._symbols:
+            return self._symbols[ticker]
+
+        stmt = Database._symbol_id_stmt(ticker, create)
+        async with self.session_factory() as session:
+            symbol_id = (await session.execute(stmt)).scalar()
+            if symbol_id is None and create:
+                symbol_id = (await session.execute(stmt)).scalar()
+            await session.commit()
+
+        if symbol_id is not None:
+            self._symbols[ticker] = symbol_id
+        return symbol_id
+
+    async def ensure_partitions(self, interval: str, start: Any, end: Any):
+        """Same as `Database.ensure_partitions`."""
+        stmts = Database._partition_stmts(interval, start, end)
+        if not stmts:
+            return
+
+        async with self.__engine.begin() as conn:
+            for stmt in stmts:
+                await conn.execute(text(stmt))
+
+    async def select_klines(
+        self,
+        ticker: str,
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+        **kwargs,
+    ):
+        """Same as `Database.select_klines`."""
+        returns = kwargs.get("returns", "model")
+        symbol_id = await self.symbol_id(ticker, create=False)
+        stmt = Database._select_klines_stmt(symbol_id, interval, from_datetime, between_datetimes, **kwargs)
+
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            match returns:
+                case "model":
+                    return result.scalars().all()
+                case "dict":
+                    return [row._asdict() for row in result]
+                case "numpy":
+                    return Database._rows_to_numpy(result, result.keys())
+
+            return [tuple(row) for row in result]
+
+    async def insert_klines(self, ticker: str, interval: str, data: np.ndarray | list[Dict]) -> bool:
+        """Same as `Database.insert_klines`."""
+        model_class = self.ModelMapping.get(interval)
+
+        if not model_class:
+            logger.error(f"Models not found to interval {interval}.")
+            return False
+
+        try:
+            data_to_insert = Database._klines_to_insert(await self.symbol_id(ticker), data)
+            times = [row["open_time"] for row in data_to_insert]
+            if times:
+                await self.ensure_partitions(interval, min(times), max(times))
+
+            stmt = insert(model_class).values(data_to_insert)
+            stmt = stmt.on_conflict_do_nothing(index_elements=["symbol_id", "open_time"])
+
+            async with self.session_factory() as session:
+                await session.execute(stmt)
+                await session.commit()
+
+            if times:
+                # cached results are served by `Database.select_klines`, the redis calls run off the event loop.
+                await asyncio.to_thread(Database._invalidate_results, ticker, interval, min(times), max(times))
+            return True
+
+        except Exception as e:
+            logger.exception(f"Error klines insertion ({ticker}, {interval}): {e}")
+            raise e
@@ -1,22 +1,159 @@
+import io
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from operator import itemgetter
-from typing import Any
+from typing import Any, Iterator
 
+import numpy as np
 import redis
 from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
 from redis.typing import ResponseT
 
-from pycrypto.commons.utils import BrokerUtils, Singleton
+from pycrypto.commons.utils import BrokerUtils, Singleton, Timing
 
 logger = logging.getLogger("app")
 
+# Rolls closed klines of KEYS[1] into buckets of ARGV[2] ms. Entries may be json ("data") or packed ("bin") records.
+# Only complete buckets (holding every source kline, like the HAVING count(*) of Database.rollup_klines) are
+# returned, packed as Cache.record_dtype. When ARGV[5] == "1" they are also appended to KEYS[2] and the bucket
+# still in progress is kept packed on KEYS[3], so repeated calls build buckets longer than the source stream.
+RESAMPLE_SCRIPT = """
+local from_ms, to_ms = tonumber(ARGV[1]), tonumber(ARGV[2])
+local maxlen, encoding, store = ARGV[3], ARGV[4], ARGV[5] == "1"
+local layout = "<i8i8ddddddi8dd"
+-- bucket in progress: kline fields, count of source klines and last source open_time.
+local state_layout = layout .. "i8i8"
+local size = to_ms / from_ms
+
+local current, start = nil, "-"
+if store then
+    local state = redis.call("GET", KEYS[3])
+    if state then
+        current = {struct.unpack(state_layout, state)}
+        start = string.format("%.0f", current[13] + 1)
+    else
+        local last = redis.call("XREVRANGE", KEYS[2], "+", "-", "COUNT", 1)
+        if #last > 0 then
+            start = string.format("%.0f", tonumber(string.match(last[1][1], "^(%d+)")) + to_ms)
+        end
+    end
+end
+
+local function parse(fields)
+    for i = 1, #fields, 2 do
+        if fields[i] == "bin" then
+            return {struct.unpack(layout, fields[i + 1])}
+        elseif fields[i] == "data" then
+            local d = cjson.decode(fields[i + 1])
+            return {
+                tonumber(d.open_time or d.t), tonumber(d.close_time or d.T),
+                tonumber(d.open or d.o), tonumber(d.close or d.c), tonumber(d.high or d.h), tonumber(d.low or d.l),
+                tonumber(d.base_asset_volume or d.v), tonumber(d.quote_asset_volume or d.q),
+                tonumber(d.number_of_trades or d.n),
+                tonumber(d.taker_buy_base_asset_volume or d.V), tonumber(d.taker_buy_quote_asset_volume or d.Q),
+            }
+        end
+    end
+end
+
+local result = {}
+local function emit(b)
+    -- buckets missing source klines (trimmed head of the stream, gaps between calls) are dropped.
+    if b[12] ~= size then
+        return
+    end
+    local packed = struct.pack(layout, b[1], b[2], b[3], b[4], b[5], b[6], b[7], b[8], b[9], b[10], b[11])
+    table.insert(result, packed)
+    if store then
+        local fields
+        if encoding == "binary" then
+            fields = {"bin", packed}
+        else
+            fields = {"data", cjson.encode({
+                open_time = b[1], close_time = b[2], open = b[3], close = b[4], high = b[5], low = b[6],
+                base_asset_volume = b[7], quote_asset_volume = b[8], number_of_trades = b[9],
+                taker_buy_base_asset_volume = b[10], taker_buy_quote_asset_volume = b[11],
+            })}
+        end
+        redis.call("XADD", KEYS[2], "MAXLEN", "~", maxlen, string.format("%.0f", b[1]) .. "-0", unpack(fields))
+    end
+end
+
+for _, entry in ipairs(redis.call("XRANGE", KEYS[1], start, "+")) do
+    local r = parse(entry[2])
+    local bucket = r[1] - (r[1] % to_ms)
+    if current == nil or current[1] ~= bucket then
+        if current ~= nil then
+            emit(current)
+        end
+        -- [12] counts the source klines and [13] keeps the last open_time, so repeated entries are counted once.
+        current = {bucket, bucket + to_ms - 1, r[3], r[4], r[5], r[6], r[7], r[8], r[9], r[10], r[11], 1, r[1]}
+    elseif r[1] > current[13] then
+        current[4] = r[4]
+        current[5] = math.max(current[5], r[5])
+        current[6] = math.min(current[6], r[6])
+        for k = 7, 11 do
+            current[k] = current[k] + r[k]
+        end
+        current[12] = current[12] + 1
+        current[13] = r[1]
+    end
+end
+
+if current ~= nil then
+    if current[12] == size then
+        emit(current)
+        current = nil
+    end
+    if store and current == nil then
+        redis.call("DEL", KEYS[3])
+    elseif store then
+        redis.call("SET", KEYS[3], struct.pack(state_layout, unpack(current, 1, 13)))
+    end
+end
+return result
+"""
+
 
 class Cache(metaclass=Singleton):
     _cache: redis.Redis = None  # type: ignore
-    key_types = {}
+    _raw: redis.Redis = None  # type: ignore
+
+    value_decoders = {
+        "bool": lambda x: x == "True",
+        "int": int,
+        "float": float,
+        "json": json.loads,
+        "datetime": lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S"),
+        "str": lambda x: x,
+    }
+
+    # "json" keeps the legacy {"data": json} entries, "binary" writes one packed record per entry on field "bin".
+    encoding = "json"
+    record_columns = BrokerUtils.kline_columns[:-1]
+    record_dtype = np.dtype(list(itemgetter(*record_columns)(BrokerUtils.columns_dtype)))
+
+    # in-process LRU of decoded closed streams: {redis_key: (last_id, array, capacity)}. 0 disables it.
+    l1_maxsize = 0
+    l1_stats = {"hits": 0, "misses": 0}
+    _l1: OrderedDict = OrderedDict()
+    _l1_lock = threading.Lock()
+
+    # "stream" appends every in-progress update on :opened; "hash" overwrites a single :current hash per stream,
+    # keeping only the last `opened_history` updates on :opened (0 disables the stream).
+    opened_mode = "stream"
+    opened_history = 0
+
+    # alternative storage of kline streams (e.g. RingBufferStore). None keeps klines on redis.
+    kline_backend = None
+
+    # results of Database.select_klines stored as .npy payloads, evicted by least recent use over `maxbytes`.
+    _query_prefix = "klines_query"
 
     def __init__(self):
         if Cache._cache is None:
@@ -32,58 +169,121 @@ class Cache(metaclass=Singleton):
             try:
                 Cache._cache = redis.Redis(**params)
                 Cache._cache.ping()
+                # binary kline payloads can't go through utf-8 decoding, so reads use a non-decoding client.
+                Cache._raw = redis.Redis(**{**params, "decode_responses": False})
             except RedisConnectionError:
                 logger.exception(
                     "Redis connection error. Please verify environment variables and service availability."
                 )
                 raise
 
+    @classmethod
+    def encode_value(cls, value: Any) -> str:
+        """Serialize a value prefixed by its type tag, so any process can decode it back."""
+        match value:
+            # bool is a subclass of int, so it must be matched first.
+            case bool():
+                tag, str_value = "bool", str(value)
+            case int():
+                tag, str_value = "int", str(value)
+            case float():
+                tag, str_value = "float", str(value)
+            case dict() | list():
+                tag, str_value = "json", json.dumps(value)
+            case datetime():
+                tag, str_value = "datetime", str(value)
+            case str():
+                tag, str_value = "str", value
+            case _:
+                raise Exception(f"Type {type(value)} is not supported by cache.")
+
+        return f"{tag}:{str_value}"
+
+    @classmethod
+    def decode_value(cls, value: str | None) -> Any:
+        if value is None:
+            return None
+
+        tag, _, str_value = value.partition(":")
+        decoder = cls.value_decoders.get(tag)
+        # values without a known tag were not written by Cache.save, so they are returned as plain strings.
+        return decoder(str_value) if decoder else value
+
+    @classmethod
+    def decode_values(cls, keys: list[str], values: list[str | None]) -> dict[str, Any]:
+        """Decode values of many keys, falling back to None only for the keys that can't be decoded."""
+        result = {}
+        for key, value in zip(keys, values):
+            try:
+                result[key] = cls.decode_value(value)
+            except Exception:
+                logger.warning(f"Error on decode key {key}.")
+                result[key] = None
+        return result
+
     @classmethod
     def save(cls, key: str, value: Any) -> bool:
         try:
-            match value:
-                case int():
-                    str_value = str(value)
-                    cls.key_types[key] = lambda x: int(x)
-                case float():
-                    str_value = str(value)
-                    cls.key_types[key] = lambda x: float(x)
-                case dict() | list():
-                    str_value = json.dumps(value)
-                    cls.key_types[key] = lambda x: json.loads(x)
-                case datetime():
-                    str_value = str(value)
-                    cls.key_types[key] = lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S")
-                case str():
-                    str_value = value
-                    cls.key_types[key] = lambda x: x
-
-            cls._cache.set(key, str_value)
+            cls._cache.set(key, cls.encode_value(value))
             return True
 
         except Exception:
             logger.exception(f"Error on save key {key}, value {value} on redis.")
             raise
 
+    @classmethod
+    def save_many(cls, mapping: dict[str, Any]) -> bool:
+        try:
+            cls._cache.mset({key: cls.encode_value(value) for key, value in mapping.items()})
+            return True
+
+        except Exception:
+            logger.exception(f"Error on save keys {list(mapping)} on redis.")
+            raise
+
     @classmethod
     def get(cls, key: str):
         try:
-            return cls.key_types[key](cls._cache.get(key))
+            value = cls._cache.get(key)
+            if value is None:
+                logger.warning(f"Key {key} not exists.")
+            return cls.decode_value(value)
         except Exception:
-            logger.warning(f"Key {key} not exists.")
+            logger.warning(f"Error on decode key {key}.")
             return None
 
     @classmethod
-    def search_keys(cls, pattern="*"):
-        return cls._cache.keys(pattern)
+    def get_many(cls, keys: list[str]) -> dict[str, Any]:
+        try:
+            values = cls._cache.mget(keys)
+        except Exception:
+            logger.warning(f"Error on get keys {keys}.")
+            return {key: None for key in keys}
+        return cls.decode_values(keys, values)
 
     @classmethod
-    def append_kline(cls, stream: Any, data: dict, closed_klines=True) -> bool | None:
+    def search_keys(cls, pattern="*", _type: str | None = None) -> list[str]:
+        return list(cls.scan_keys(pattern, _type))
+
+    @classmethod
+    def scan_keys(cls, pattern="*", _type: str | None = None, count: int = 1000) -> Iterator[str]:
+        """Iterate keys with incremental SCAN calls, so Redis is never blocked like on KEYS.
+
+        Args:
+            pattern: glob-style pattern of keys.
+            _type: optional Redis type filter, e.g. "stream".
+            count: hint of keys inspected per SCAN call.
+
+        """
+        yield from cls._cache.scan_iter(match=pattern, count=count, _type=_type)
+
+    @staticmethod
+    def _stream_key(stream: Any, closed_klines=True) -> tuple[str, str]:
         match stream:
             case str():
-                redis_key = stream
+                redis_key, interval = stream, stream.split("_")[1]
             case tuple() | list():
-                redis_key = "@kline_".join(stream)
+                redis_key, interval = "@kline_".join(stream), stream[1]
             case _:
                 raise Exception(
                     "Stream parameter must be a tuple of (ticker,interval) or string like ticker@kline_interval."
@@ -91,49 +291,90 @@ class Cache(metaclass=Singleton):
 
         redis_key = redis_key.lower()
         redis_key += ":closed" if closed_klines else ":opened"
-        maxlen = cls._maxlen[stream[1]] if isinstance(stream, list | tuple) else cls._maxlen[stream.split("_")[1]]
+        return redis_key, interval
+
+    @classmethod
+    def append_kline(cls, stream: Any, data: dict, closed_klines=True) -> bool | None:
+        if cls.kline_backend is not None:
+            return cls.kline_backend.append_kline(stream, data, closed_klines)
+
+        redis_key, interval = cls._stream_key(stream, closed_klines)
 
         try:
-            opentime = data.get("open_time") or data.get("t")
-            cls._cache.xadd(
-                redis_key,
-                {"data": json.dumps(data)},
-                id=f"{opentime}-*",
-                maxlen=maxlen,
-                approximate=True,
-            )
+            pipe = cls._cache.pipeline(transaction=False)
+            cls._queue_kline(pipe, redis_key, interval, data, closed_klines)
+            pipe.execute()
             return True
         except Exception:
             logger.exception(f"Error on append_klines {stream}")
             return None
 
-    # TODO: Aqui o cache sempre espera um objeto de list[dict] ... devemos implementar a possibilidade do mesmo método trabalhar com um numpy array
     @classmethod
-    def append_klines(cls, stream: Any, data: list[dict], closed_klines=True) -> bool | None:
-        pipe = cls._cache.pipeline()
-        match stream:
-            case str():
-                redis_key = stream
-            case tuple() | list():
-                redis_key = "@kline_".join(stream)
-            case _:
-                raise Exception(
-                    "Stream parameter must be a tuple of (ticker,interval) or string like ticker@kline_interval."
-                )
+    def append_kline_batch(cls, entries: list[tuple[Any, dict, bool]]) -> int:
+        """Append (stream, data, closed_klines) entries of any streams in a single pipeline.
 
-        redis_key = redis_key.lower()
-        redis_key += ":closed" if closed_klines else ":opened"
-        maxlen = cls._maxlen[stream[1]] if isinstance(stream, list | tuple) else cls._maxlen[stream.split("_")[1]]
+        Returns:
+            number of redis commands that failed.
+
+        """
+        if cls.kline_backend is not None:
+            for stream, data, closed_klines in entries:
+                cls.kline_backend.append_kline(stream, data, closed_klines)
+            return 0
+
+        pipe = cls._cache.pipeline(transaction=False)
+        for stream, data, closed_klines in entries:
+            redis_key, interval = cls._stream_key(stream, closed_klines)
+            cls._queue_kline(pipe, redis_key, interval, data, closed_klines)
+
+        errors = [r for r in pipe.execute(raise_on_error=False) if isinstance(r, Exception)]
+        if errors:
+            logger.warning(f"{len(errors)} commands failed appending {len(entries)} klines. First error: {errors[0]}")
+        return len(errors)
+
+    @classmethod
+    def _queue_kline(cls, pipe, redis_key: str, interval: str, data: dict, closed_klines: bool):
+        opentime = data.get("open_time") or data.get("t")
+        fields = cls.encode_kline(data)
+
+        if closed_klines or cls.opened_mode != "hash":
+            pipe.xadd(redis_key, fields, id=f"{opentime}-*", maxlen=cls._maxlen[interval], approximate=True)
+            return
+
+        current_key = redis_key.removesuffix(":opened") + ":current"
+        # fields are overwritten in place, so readers never see the hash empty. The field of the other encoding
+        # is dropped after, and until then readers prefer the field of `Cache.encoding`.
+        pipe.hset(current_key, mapping=fields)
+        pipe.hdel(current_key, "data" if "bin" in fields else "bin")
+        if cls.opened_history:
+            pipe.xadd(redis_key, fields, id=f"{opentime}-*", maxlen=cls.opened_history, approximate=False)
+
+    @classmethod
+    def append_klines(
+        cls, stream: Any, data: list[dict] | np.ndarray, closed_klines=True, batch_size: int = 1000
+    ) -> bool | None:
+        """Append many klines to a stream, flushing one pipeline every `batch_size` entries.
+
+        `data` may be a list of dicts or a structured array (e.g. from `BinanceSpot.convert_spotklines_to_numpy`),
+        which is encoded in bulk without building a dict per row.
+        """
+        if cls.kline_backend is not None:
+            return cls.kline_backend.append_klines(stream, data, closed_klines)
+
+        pipe = cls._cache.pipeline(transaction=False)
+        redis_key, interval = cls._stream_key(stream, closed_klines)
+        maxlen = cls._maxlen[interval]
 
         try:
-            for item in data:
-                pipe.xadd(
-                    redis_key,
-                    {"data": json.dumps(item)},
-                    id=item["open_time"],
-                    maxlen=maxlen,
-                    approximate=True,
-                )
+            if isinstance(data, np.ndarray):
+                entries = zip(data["open_time"].tolist(), cls.encode_klines(data))
+            else:
+                entries = ((item["open_time"], cls.encode_kline(item)) for item in data)
+
+            for count, (open_time, fields) in enumerate(entries, start=1):
+                pipe.xadd(redis_key, fields, id=open_time, maxlen=maxlen, approximate=True)
+                if count % batch_size == 0:
+                    pipe.execute()
             pipe.execute()
             return True
         except Exception:
@@ -150,21 +391,45 @@ class Cache(metaclass=Singleton):
         closed_klines=True,
         limit=None,
         only_columns=[],
-    ) -> list | None:
+        as_array: bool | None = None,
+    ) -> list | np.ndarray | None:
+        """Read the last klines of a stream.
+
+        With `as_array` (default when `Cache.encoding == "binary"`) the result is a structured array, oldest first,
+        holding `only_columns` (or every `Cache.record_columns`). Otherwise a list of dicts, newest first.
+        Both entry formats are readable on any mode.
+        """
+
         def get_data(x):
-            return json.loads(x[1]["data"])
+            return json.loads(x[1][b"data"])
 
         try:
             redis_key = f"{ticker.lower()}@kline_{interval}"
             redis_key += ":closed" if closed_klines or interval == "1s" else ":opened"
             _limit = cls._maxlen[interval] if not limit else limit
+            as_array = cls.encoding == "binary" if as_array is None else as_array
+
+            if cls.kline_backend is not None:
+                arr = cls.kline_backend.get_klines(ticker, interval, min_range, max_range, closed_klines, _limit)
+                arr = cls.project_columns(arr, only_columns)
+                return arr if as_array else [dict(zip(arr.dtype.names, row)) for row in arr.tolist()[::-1]]
+
+            if as_array and cls.l1_maxsize and redis_key.endswith(":closed") and (min_range, max_range) == ("-", "+"):
+                return cls.project_columns(cls._get_klines_l1(redis_key, _limit), only_columns)
+
+            raw_data = cls._raw.xrevrange(redis_key, max=max_range, min=min_range, count=_limit)
 
-            raw_data = cls._cache.xrevrange(redis_key, max=max_range, min=min_range, count=_limit)
+            if as_array:
+                return cls.project_columns(cls.decode_klines(raw_data)[::-1], only_columns)
+
+            if any(b"bin" in d[1] for d in raw_data):
+                arr = cls.project_columns(cls.decode_klines(raw_data), only_columns)
+                return [dict(zip(arr.dtype.names, row)) for row in arr.tolist()]
 
             r = (
                 [get_data(d) for d in raw_data]
                 if only_columns == []
-                else [itemgetter(*only_columns, get_data(d)) for d in raw_data]
+                else [{col: row[col] for col in only_columns} for row in map(get_data, raw_data)]
             )
 
             return r
@@ -173,12 +438,312 @@ class Cache(metaclass=Singleton):
             logger.warning(f"Error on get_klines {redis_key}. Check if this key exists.")
             return None
 
+    @classmethod
+    def _get_klines_l1(cls, redis_key: str, limit: int) -> np.ndarray:
+        """Serve the last `limit` closed klines from the L1 cache, reading only entries newer than the cached id."""
+        with cls._l1_lock:
+            entry = cls._l1.get(redis_key)
+            delta = []
+            if entry is not None and entry[2] >= limit:
+                last_id, arr, capacity = entry
+                delta = cls._raw.xrange(redis_key, min=b"(" + last_id, max="+", count=capacity)
+
+            if entry is None or entry[2] < limit or len(delta) >= capacity:
+                cls.l1_stats["misses"] += 1
+                capacity = max(limit, entry[2] if entry else 0)
+                raw_data = cls._raw.xrevrange(redis_key, count=capacity)
+                arr = cls.decode_klines(raw_data)[::-1]
+                last_id = raw_data[0][0] if raw_data else b"0-0"
+            else:
+                cls.l1_stats["hits"] += 1
+                if delta:
+                    arr = np.concatenate([arr, cls.decode_klines(delta)])[-capacity:]
+                    last_id = delta[-1][0]
+
+            cls._l1[redis_key] = (last_id, arr, capacity)
+            cls._l1.move_to_end(redis_key)
+            while len(cls._l1) > cls.l1_maxsize:
+                cls._l1.popitem(last=False)
+
+            return arr[-limit:]
+
+    @classmethod
+    def l1_invalidate(cls, redis_key: str | None = None):
+        """Drop one stream (or every stream) from the L1 cache."""
+        with cls._l1_lock:
+            if redis_key is None:
+                cls._l1.clear()
+            else:
+                cls._l1.pop(redis_key, None)
+
+    @classmethod
+    def query_key(cls, ticker: str, interval: str, start: int, end: int, cols: list[str]) -> str:
+        return f"{cls._query_prefix}:{ticker}:{interval}:{start}:{end}:{','.join(cols) or '*'}"
+
+    @classmethod
+    def _query_index(cls, ticker: str, interval: str) -> str:
+        """Set of the stored query results of a (ticker, interval), so invalidation never scans every result."""
+        return f"{cls._query_prefix}:index:{ticker}:{interval}"
+
+    @classmethod
+    def get_query_result(cls, key: str) -> np.ndarray | None:
+        payload = cls._raw.get(key)
+        if payload is None:
+            return None
+        cls._cache.zadd(f"{cls._query_prefix}:lru", {key: time.time()})
+        return np.load(io.BytesIO(payload))
+
+    @classmethod
+    def save_query_result(cls, key: str, data: np.ndarray, maxbytes: int) -> bool:
+        """Store a query result, evicting the least recently used ones while all results exceed `maxbytes`."""
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        payload = buffer.getvalue()
+        if len(payload) > maxbytes:
+            return False
+
+        lru, sizes = f"{cls._query_prefix}:lru", f"{cls._query_prefix}:sizes"
+        _, ticker, interval, *_ = key.split(":")
+        pipe = cls._raw.pipeline()
+        pipe.set(key, payload)
+        pipe.hset(sizes, key, len(payload))
+        pipe.zadd(lru, {key: time.time()})
+        pipe.sadd(cls._query_index(ticker, interval), key)
+        pipe.sadd(f"{cls._query_prefix}:tickers:{interval}", ticker)
+        pipe.execute()
+
+        total = sum(map(int, cls._cache.hvals(sizes)))
+        while total > maxbytes:
+            evicted = cls._cache.zpopmin(lru)
+            if not evicted:
+                break
+            evicted_key = evicted[0][0]
+            _, ticker, interval, *_ = evicted_key.split(":")
+            total -= int(cls._cache.hget(sizes, evicted_key) or 0)
+            cls._cache.delete(evicted_key)
+            cls._cache.hdel(sizes, evicted_key)
+            cls._cache.srem(cls._query_index(ticker, interval), evicted_key)
+        return True
+
+    @classmethod
+    def invalidate_query_results(
+        cls, ticker: str | None, interval: str, start: int | None = None, end: int | None = None
+    ) -> int:
+        """Drop stored query results of an interval (optionally of a ticker) overlapping a range of open_time.
+
+        Only the results indexed for the (ticker, interval) are inspected, or those of every ticker of the interval
+        when `ticker` is None.
+
+        Returns:
+            number of results dropped.
+
+        """
+        lru, sizes = f"{cls._query_prefix}:lru", f"{cls._query_prefix}:sizes"
+        tickers = (
+            [ticker] if ticker is not None else sorted(cls._cache.smembers(f"{cls._query_prefix}:tickers:{interval}"))
+        )
+        pipe = cls._cache.pipeline(transaction=False)
+        for key_ticker in tickers:
+            pipe.smembers(cls._query_index(key_ticker, interval))
+
+        dropped = {}
+        for key_ticker, keys in zip(tickers, pipe.execute()):
+            for key in keys:
+                key_start, key_end = map(int, key.split(":")[3:5])
+                if (start is None or key_end >= start) and (end is None or key_start <= end):
+                    dropped.setdefault(key_ticker, []).append(key)
+
+        if dropped:
+            keys = [key for ticker_keys in dropped.values() for key in ticker_keys]
+            pipe = cls._cache.pipeline()
+            pipe.delete(*keys)
+            pipe.hdel(sizes, *keys)
+            pipe.zrem(lru, *keys)
+            for key_ticker, ticker_keys in dropped.items():
+                pipe.srem(cls._query_index(key_ticker, interval), *ticker_keys)
+            pipe.execute()
+        return sum(map(len, dropped.values()))
+
+    @classmethod
+    def get_open_kline(cls, ticker: str, interval: str, as_array: bool | None = None) -> dict | np.ndarray | None:
+        """Read the current in-progress kline kept by `opened_mode = "hash"`.
+
+        Returns a dict (the kline as received) or, with `as_array`, a one row structured array. None if not found.
+        """
+        current_key = f"{ticker.lower()}@kline_{interval}:current"
+        return cls.decode_open_kline(current_key, cls._raw.hgetall(current_key), as_array)
+
+    @classmethod
+    def decode_open_kline(
+        cls, current_key: str, fields: dict, as_array: bool | None = None
+    ) -> dict | np.ndarray | None:
+        """Decode the fields of a :current hash read by the non-decoding client, as `get_open_kline` returns it."""
+        if not fields:
+            return None
+
+        field = b"bin" if b"bin" in fields and (cls.encoding == "binary" or b"data" not in fields) else b"data"
+        as_array = cls.encoding == "binary" if as_array is None else as_array
+        if field == b"data" and not as_array:
+            return json.loads(fields[field])
+
+        arr = cls.decode_klines([(current_key, {field: fields[field]})])
+        return arr if as_array else dict(zip(arr.dtype.names, arr.tolist()[0]))
+
+    @classmethod
+    def get_klines_many(
+        cls, streams: list[tuple[str, str, int | None]], closed_klines=True, only_columns=[]
+    ) -> dict[tuple[str, str], np.ndarray]:
+        """Fetch many streams in a single round trip.
+
+        Args:
+            streams: list of (ticker, interval, limit). A falsy limit reads up to the interval maxlen.
+            closed_klines: read the closed or opened streams.
+            only_columns: column projection applied to every array.
+
+        Returns:
+            dict keyed by (ticker, interval) with structured arrays, oldest first. Missing streams are empty.
+
+        """
+        if cls.kline_backend is not None:
+            return {
+                (ticker, interval): cls.project_columns(
+                    cls.kline_backend.get_klines(ticker, interval, closed_klines=closed_klines, limit=limit),
+                    only_columns,
+                )
+                for ticker, interval, limit in streams
+            }
+
+        pipe = cls._raw.pipeline(transaction=False)
+        for ticker, interval, limit in streams:
+            redis_key = f"{ticker.lower()}@kline_{interval}"
+            redis_key += ":closed" if closed_klines or interval == "1s" else ":opened"
+            pipe.xrevrange(redis_key, count=limit or cls._maxlen[interval])
+
+        try:
+            results = pipe.execute()
+        except Exception:
+            logger.exception(f"Error on get_klines_many of {len(streams)} streams.")
+            raise
+
+        return {
+            (ticker, interval): cls.project_columns(cls.decode_klines(raw_data)[::-1], only_columns)
+            for (ticker, interval, _), raw_data in zip(streams, results)
+        }
+
+    @classmethod
+    def resample(cls, ticker: str, from_interval: str, to_interval: str, store=True) -> np.ndarray:
+        """Aggregate closed klines of `from_interval` into `to_interval` inside redis.
+
+        The source stream only holds its maxlen entries. With `store`, the bucket in progress is kept on redis
+        (e.g. btcusdt@kline_1h:resample:1s) and each call appends the buckets it completes to the `to_interval`
+        closed stream, so buckets of any size are built as long as calls run at least once per source window.
+        Without `store`, buckets must fit in the source stream.
+
+        Args:
+            ticker: ticker of the streams.
+            from_interval: interval of the source closed stream, e.g. "1s".
+            to_interval: target interval, a multiple of `from_interval`.
+            store: append the complete buckets to the target stream, carrying the bucket in progress between calls.
+
+        Returns:
+            structured array of `Cache.record_dtype` with the complete buckets computed, oldest first.
+
+        """
+        from_ms = int(Timing.delta_intervals[from_interval].total_seconds() * 1000)
+        to_ms = int(Timing.delta_intervals[to_interval].total_seconds() * 1000)
+        if to_ms <= from_ms or to_ms % from_ms:
+            raise Exception(f"Interval {to_interval} must be a multiple of {from_interval}.")
+        if not store and to_ms // from_ms > cls._maxlen[from_interval]:
+            e = f"Buckets of {to_interval} don't fit in the {from_interval} stream, resample them with store=True."
+            logger.error(e)
+            raise Exception(e)
+
+        source, _ = cls._stream_key((ticker, from_interval))
+        target, _ = cls._stream_key((ticker, to_interval))
+        state = f"{target.removesuffix(':closed')}:resample:{from_interval}"
+        try:
+            packed = cls._raw.register_script(RESAMPLE_SCRIPT)(
+                keys=[source, target, state],
+                args=[from_ms, to_ms, cls._maxlen[to_interval], cls.encoding, int(store)],
+            )
+        except Exception:
+            logger.exception(f"Error on resample {source} to {to_interval}.")
+            raise
+
+        return np.frombuffer(b"".join(packed), dtype=cls.record_dtype).copy()
+
+    @staticmethod
+    def project_columns(arr: np.ndarray, only_columns: list) -> np.ndarray:
+        """Copy `arr` into a packed, writable array holding only the requested columns (all of them if empty)."""
+        names = list(only_columns) or list(arr.dtype.names)
+        result = np.empty(arr.size, dtype=[(col, arr.dtype[col]) for col in names])
+        for col in names:
+            result[col] = arr[col]
+        return result
+
+    @classmethod
+    def encode_kline(cls, data: dict) -> dict:
+        """Build the stream entry fields of a kline following `Cache.encoding`.
+
+        Accepts both REST (open_time, open, ...) and websocket (t, o, ...) keys.
+        """
+        if cls.encoding != "binary":
+            return {"data": json.dumps(data)}
+
+        return {"bin": np.array([cls._kline_record(data)], dtype=cls.record_dtype).tobytes()}
+
+    @classmethod
+    def encode_klines(cls, data: np.ndarray) -> list[dict]:
+        """Bulk version of `encode_kline` for structured arrays holding at least `Cache.record_columns`."""
+        if cls.encoding != "binary":
+            # rows are formatted from encoded columns into the layout of json.dumps(dict), so no dict is built per row.
+            names = data.dtype.names
+            template = "{" + ", ".join(f"{json.dumps(name)}: %s" for name in names) + "}"
+            columns = [
+                map(json.dumps, data[col].astype(str).tolist() if data.dtype[col].kind == "S" else data[col].tolist())
+                for col in names
+            ]
+            return [{"data": template % row} for row in zip(*columns)]
+
+        records = np.empty(data.size, dtype=cls.record_dtype)
+        for col in cls.record_columns:
+            records[col] = data[col]
+
+        payload, size = records.tobytes(), cls.record_dtype.itemsize
+        return [{"bin": payload[i : i + size]} for i in range(0, len(payload), size)]
+
+    @classmethod
+    def decode_klines(cls, raw_data: list) -> np.ndarray:
+        """Convert raw stream entries (read by the non-decoding client) into a `Cache.record_dtype` array.
+
+        Binary entries are decoded with a single `np.frombuffer`; legacy json entries are packed row by row.
+        """
+        if len(raw_data) == 0:
+            return np.empty(0, dtype=cls.record_dtype)
+
+        if all(b"bin" in fields for _, fields in raw_data):
+            return np.frombuffer(b"".join(fields[b"bin"] for _, fields in raw_data), dtype=cls.record_dtype)
+
+        arr = np.empty(len(raw_data), dtype=cls.record_dtype)
+        for idx, (_, fields) in enumerate(raw_data):
+            if b"bin" in fields:
+                arr[idx] = np.frombuffer(fields[b"bin"], dtype=cls.record_dtype)[0]
+            else:
+                arr[idx] = cls._kline_record(json.loads(fields[b"data"]))
+        return arr
+
+    @classmethod
+    def _kline_record(cls, data: dict) -> tuple:
+        return tuple(
+            data[col] if col in data else data[BrokerUtils.ws_columns_names[col]] for col in cls.record_columns
+        )
+
     @classmethod
     def get_info_stream(cls, ticker: str, interval: str, closed_klines=True) -> dict | ResponseT:
         try:
             redis_key = f"{ticker.lower()}@kline_{interval}"
             redis_key += ":closed" if closed_klines else ":opened"
-            return cls._cache.xinfo_stream(redis_key)
+            return cls.decode_stream_info(cls._raw.xinfo_stream(redis_key))
 
         except ResponseError:
             logger.warning(f"The key {redis_key} not exists.")
@@ -188,12 +753,32 @@ class Cache(metaclass=Singleton):
             logger.exception(f"Error on get_info_stream of ticker {ticker}, interval {interval}")
             raise
 
+    @staticmethod
+    def decode_stream_info(info: dict) -> dict:
+        """Decode XINFO STREAM read by the non-decoding client, keeping packed ("bin") entry fields as bytes."""
+
+        def decode(value):
+            if isinstance(value, bytes):
+                return value.decode()
+            if isinstance(value, (tuple, list)) and len(value) == 2 and isinstance(value[1], dict):
+                entry_id, fields = value
+                return entry_id.decode(), {k.decode(): v if k == b"bin" else v.decode() for k, v in fields.items()}
+            return value
+
+        return {key: decode(value) for key, value in info.items()}
+
     @classmethod
     def delete_stream(cls, ticker: str, interval: str, closed_klines=True) -> bool:
         _stream = f"{ticker.lower()}@kline_{interval}"
-        _stream += ":closed" if closed_klines else ":opened"
+        # the opened stream also owns the :current hash of opened_mode = "hash".
+        _keys = [_stream + ":closed"] if closed_klines else [_stream + ":opened", _stream + ":current"]
+        _stream = _keys[0]
+        if cls.kline_backend is not None:
+            return cls.kline_backend.delete_stream(ticker, interval, closed_klines)
+
         try:
-            cls._cache.delete(_stream)
+            cls._cache.delete(*_keys)
+            cls.l1_invalidate(_stream)
             return True
         except Exception:
             logger.warning(f"Error on delete stream of ticker {ticker}, interval {interval}")
@@ -201,6 +786,9 @@ class Cache(metaclass=Singleton):
 
     @classmethod
     def check_key_exists(cls, ticker: str, interval: str, closed_klines=True) -> bool:
+        if cls.kline_backend is not None:
+            return cls.kline_backend.check_key_exists(ticker, interval, closed_klines)
+
         redis_key = f"{ticker.lower()}@kline_{interval}"
         redis_key += ":closed" if closed_klines else ":opened"
         return bool(cls._cache.exists(redis_key))
@@ -223,6 +811,7 @@ class Cache(metaclass=Singleton):
         pipe = cls._cache.pipeline()
         try:
             pipe.xdel(_stream, list_ids)
+            cls.l1_invalidate(_stream)
             return True
         except Exception:
             logger.exception("Error on deletion stream data.")
@@ -236,6 +825,7 @@ class Cache(metaclass=Singleton):
         _stream += ":closed" if closed_klines else ":opened"
         try:
             pipe.xtrim(_stream, maxlen=nlast, approximate=True)
+            cls.l1_invalidate(_stream)
             return True
         except Exception:
             logger.warning(
@@ -247,6 +837,7 @@ class Cache(metaclass=Singleton):
     def flushdb(cls) -> bool:
         try:
             cls._cache.flushdb()
+            cls.l1_invalidate()
             return True
         except Exception:
             logger.warning("Error on flush redis.")
@@ -0,0 +1,88 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any
+
+from pycrypto.commons.cache import Cache
+
+logger = logging.getLogger("app")
+
+
+class KlineWriter:
+    """Write-behind buffer for kline appends.
+
+    Producers (e.g. websocket callbacks) only enqueue klines; a background thread flushes them to Redis
+    in a single pipeline every `batch_size` klines or `flush_interval_ms`, whichever comes first.
+    When `maxsize` klines are waiting, `put` blocks until the writer catches up.
+
+    Args:
+        batch_size: max number of klines per pipeline.
+        flush_interval_ms: max time a kline waits on buffer after the first one of its batch.
+        maxsize: max number of klines waiting on buffer.
+
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval_ms: int = 100, maxsize: int = 10_000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._closing = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._closing.clear()
+            self._thread = threading.Thread(target=self._run, name="kline-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, stream: Any, data: dict, closed_klines=True):
+        self._queue.put((stream, data, closed_klines))
+
+    def close(self, timeout: float | None = None):
+        """Flush every buffered kline and stop the writer thread."""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._flush(self._drain_all())
+
+    def _run(self):
+        while not (self._closing.is_set() and self._queue.empty()):
+            self._flush(self._next_batch())
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain_all(self) -> list:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        try:
+            Cache.append_kline_batch(batch)
+        except Exception:
+            logger.exception(f"Error on flushing {len(batch)} klines to cache.")
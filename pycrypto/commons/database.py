@@ -1,15 +1,31 @@
 import logging
 import os
 from contextlib import contextmanager
-from typing import Any, Dict
+from itertools import groupby
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterator
 
 import numpy as np
-from sqlalchemy import create_engine, delete, select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import (
+    SmallInteger,
+    any_,
+    bindparam,
+    create_engine,
+    delete,
+    exists,
+    func,
+    literal,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session
 
 import pycrypto.commons.models_main as m
-from pycrypto.commons.utils import Singleton, Timing, convert_any_to_timestamp
+from pycrypto.commons.cache import Cache
+from pycrypto.commons.utils import BrokerUtils, Singleton, Timing, convert_any_to_timestamp
 
 logger = logging.getLogger("app")
 
@@ -31,6 +47,10 @@ class Database(metaclass=Singleton):
         "1d": m.Klines_1d,
     }
 
+    # max bytes of numpy results of closed ranges kept on redis by `Cache`. 0 disables caching of new results,
+    # writes always drop the overlapping results cached by any process.
+    result_cache_maxbytes = 0
+
     def __init__(self, **kwargs):
         self.__connection_str = kwargs.get("connection_str", "")
         configs = kwargs.get("configs", {})
@@ -43,6 +63,7 @@ class Database(metaclass=Singleton):
             configs = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 20}
 
         self.__engine = create_engine(self.__connection_str, **configs)
+        self._symbols: dict[str, int] = {}
 
     @property
     def connection_str(self):
@@ -53,6 +74,63 @@ class Database(metaclass=Singleton):
         with Session(self.__engine) as session:
             yield session
 
+    def symbol_id(self, ticker: str, create=True) -> int | None:
+        """Id of a ticker on symbols table, cached in process.
+
+        Args:
+            ticker: ticker of klines.
+            create: register the ticker when it is unknown.
+
+        Returns:
+            id of ticker, or None when it is unknown and create is False.
+
+        """
+        if ticker in self._symbols:
+            return self._symbols[ticker]
+
+        stmt = self._symbol_id_stmt(ticker, create)
+        with self.session_factory() as session:
+            symbol_id = session.execute(stmt).scalar()
+            if symbol_id is None and create:
+                # another process registered the ticker at the same time, it is visible to a new statement.
+                symbol_id = session.execute(stmt).scalar()
+            session.commit()
+
+        if symbol_id is not None:
+            self._symbols[ticker] = symbol_id
+        return symbol_id
+
+    @staticmethod
+    def _symbol_id_stmt(ticker: str, create: bool):
+        """Select the id of a ticker, inserting it only when it is missing.
+
+        A conflicting INSERT still takes a value of the SMALLINT id sequence, so registered tickers never reach it.
+        """
+        existing = select(m.Symbol.id).where(m.Symbol.ticker == ticker)
+        if not create:
+            return existing
+
+        existing = existing.cte("existing")
+        inserted = (
+            insert(m.Symbol)
+            .from_select(["ticker"], select(literal(ticker)).where(~exists(existing.select())))
+            .on_conflict_do_nothing(index_elements=["ticker"])
+            .returning(m.Symbol.id)
+            .cte("inserted")
+        )
+        return union_all(select(existing.c.id), select(inserted.c.id))
+
+    def symbol_ids(self, tickers: list[str]) -> dict[str, int]:
+        """Ids of many known tickers in a single query. Unknown tickers are left out."""
+        missing = [t for t in tickers if t not in self._symbols]
+        if missing:
+            stmt = select(m.Symbol.ticker, m.Symbol.id).where(
+                m.Symbol.ticker == any_(bindparam("tickers", missing, type_=ARRAY(m.Symbol.ticker.type)))
+            )
+            with self.session_factory() as session:
+                self._symbols.update(dict(session.execute(stmt).tuples().all()))
+        return {t: self._symbols[t] for t in tickers if t in self._symbols}
+
     def clean_kline_table(self, intervals: list[str]):
         models = [self.ModelMapping.get(i) for i in intervals]
 
@@ -65,18 +143,120 @@ class Database(metaclass=Singleton):
             with self.session_factory() as session:
                 for model in models:
                     session.execute(delete(model))
+                # ingest and rollup watermarks of cleaned tables are no longer valid.
+                for interval in intervals:
+                    session.execute(delete(m.AppConfig).where(m.AppConfig.key.like(f"%watermark:%:{interval}")))
                 session.commit()
+            for interval in intervals:
+                self._invalidate_results(None, interval)
         except Exception as e:
             logger.exception("Error on clen_kline_table.")
             raise e
 
-    def select_klines(
-        self,
-        ticker: str,
-        interval: str,
-        from_datetime: Any = "",
-        between_datetimes: tuple[Any, Any] = ("", ""),
-        **kwargs,
+    @staticmethod
+    def _is_partitioned(model) -> bool:
+        return bool(model.__table__.dialect_options["postgresql"]["partition_by"])
+
+    @classmethod
+    def _partition_stmts(cls, interval: str, start: Any, end: Any) -> list[str]:
+        """DDL of the monthly partitions covering a datetime range."""
+        model = cls.ModelMapping.get(interval)
+        if model is None or not cls._is_partitioned(model):
+            return []
+
+        table = model.__tablename__
+        month = datetime.fromtimestamp(convert_any_to_timestamp(start) // 1000, timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        last = convert_any_to_timestamp(end)
+        stmts = []
+
+        while int(month.timestamp() * 1000) <= last:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            name = f"{table}_y{month:%Y}m{month:%m}"
+            lower, upper = int(month.timestamp() * 1000), int(next_month.timestamp() * 1000)
+            stmts.append(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM ({lower}) TO ({upper})"
+            )
+            month = next_month
+
+        return stmts
+
+    def ensure_partitions(self, interval: str, start: Any, end: Any):
+        """Create the monthly partitions of a partitioned klines table covering a datetime range.
+
+        Tables which are not partitioned are left untouched. Partitions are not cached by process, as any process
+        may drop them (`drop_kline_partitions`), so every call checks them with CREATE TABLE IF NOT EXISTS.
+
+        Args:
+            interval: interval of klines.
+            start: first datetime on any type.
+            end: last datetime on any type.
+
+        """
+        stmts = self._partition_stmts(interval, start, end)
+        if not stmts:
+            return
+
+        with self.__engine.begin() as conn:
+            for stmt in stmts:
+                conn.execute(text(stmt))
+
+    def drop_kline_partitions(self, interval: str, before_datetime: Any, detach_only=False) -> list[str]:
+        """Retention of partitioned klines tables: remove every monthly partition which ends before a datetime.
+
+        Args:
+            interval: interval of klines.
+            before_datetime: datetime on any type, partitions holding klines after it are kept.
+            detach_only: detach the partitions from the table instead of dropping them (e.g. to archive them).
+
+        Returns:
+            names of removed partitions.
+
+        """
+        model = self.ModelMapping.get(interval)
+        if model is None or not self._is_partitioned(model):
+            e = f"Table of interval {interval} is not partitioned."
+            logger.error(e)
+            raise Exception(e)
+
+        table = model.__tablename__
+        cutoff = convert_any_to_timestamp(before_datetime)
+        stmt = text(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = :table
+            ORDER BY child.relname
+            """
+        )
+
+        removed = []
+        with self.__engine.begin() as conn:
+            for name in conn.execute(stmt, {"table": table}).scalars().all():
+                try:
+                    month = datetime.strptime(name.removeprefix(f"{table}_"), "y%Ym%m").replace(tzinfo=timezone.utc)
+                except ValueError:
+                    # children created out of the monthly scheme (e.g. a DEFAULT partition) are not managed here.
+                    logger.warning(f"Partition {name} of {table} is not monthly, skipping it.")
+                    continue
+                upper = (month + timedelta(days=32)).replace(day=1)
+                if int(upper.timestamp() * 1000) > cutoff:
+                    continue
+                if detach_only:
+                    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                else:
+                    conn.execute(text(f"DROP TABLE {name}"))
+                removed.append(name)
+
+        self._invalidate_results(None, interval, end=cutoff)
+        logger.info(f"Partitions removed of {table}: {removed}")
+        return removed
+
+    @classmethod
+    def _select_klines_stmt(
+        cls, symbol_id: int | None | list[int], interval: str, from_datetime: Any, between_datetimes: tuple, **kwargs
     ):
         if interval not in Timing.klines_intervals_available:
             e = "Interval not available."
@@ -85,12 +265,17 @@ class Database(metaclass=Singleton):
 
         returns = kwargs.get("returns", "model")
         cols = kwargs.get("cols", "")
-        model = self.ModelMapping.get(interval)
+        model = cls.ModelMapping.get(interval)
         model_cols = None
 
-        if returns in ["tuple", "dict"]:
+        if returns in ["tuple", "dict", "numpy"]:
             if cols == "":
-                model_cols = model.__table__.columns
+                # symbol is already known by caller, numpy arrays keep only kline columns.
+                model_cols = (
+                    model.__table__.columns
+                    if returns != "numpy"
+                    else [c for c in model.__table__.columns if c.name != "symbol_id"]
+                )
             else:
                 try:
                     model_cols = [model.__table__.columns[c] for c in cols]
@@ -99,6 +284,12 @@ class Database(metaclass=Singleton):
                     logger.exception(e)
                     raise
 
+        # a list of symbols is sent as one array param, so the statement is the same whatever its size.
+        if isinstance(symbol_id, list):
+            symbol_filter = model.symbol_id == any_(bindparam("symbol_ids", symbol_id, type_=ARRAY(SmallInteger)))
+        else:
+            symbol_filter = model.symbol_id == symbol_id
+
         match model_cols:
             case None:
                 stmt = select(model)
@@ -108,16 +299,91 @@ class Database(metaclass=Singleton):
                 stmt = select(model_cols)
 
         if from_datetime == "" and between_datetimes == ("", ""):
-            stmt = stmt.where(model.ticker == ticker)
+            stmt = stmt.where(symbol_filter)
 
         if from_datetime != "":
             start = convert_any_to_timestamp(from_datetime)
-            stmt = stmt.where(model.ticker == ticker, model.open_time >= start)
+            stmt = stmt.where(symbol_filter, model.open_time >= start)
 
         if all(between_datetimes):
             start = convert_any_to_timestamp(between_datetimes[0])
             end = convert_any_to_timestamp(between_datetimes[1])
-            stmt = stmt.where(model.ticker == ticker, model.open_time.between(start, end + 1))
+            stmt = stmt.where(symbol_filter, model.open_time.between(start, end + 1))
+
+        if returns == "numpy":
+            stmt = stmt.order_by(model.open_time)
+
+        return stmt
+
+    @staticmethod
+    def _rows_to_numpy(rows, columns) -> np.ndarray:
+        dtypes = [BrokerUtils.columns_dtype[c] for c in columns]
+        return np.fromiter((tuple(row) for row in rows), dtype=dtypes)
+
+    def _result_cache_key(self, ticker: str, interval: str, between_datetimes: tuple, **kwargs) -> str | None:
+        """Key of a select_klines result which can be cached: numpy results of ranges where every kline is closed."""
+        if not self.result_cache_maxbytes or kwargs.get("returns") != "numpy" or not all(between_datetimes):
+            return None
+
+        start = convert_any_to_timestamp(between_datetimes[0])
+        end = convert_any_to_timestamp(between_datetimes[1])
+        step = int(Timing.delta_intervals[interval].total_seconds() * 1000)
+        # select_klines reads open_time up to end + 1.
+        if end + 1 + step > datetime.now().timestamp() * 1000:
+            return None
+
+        Cache()
+        return Cache.query_key(ticker, interval, start, end, list(kwargs.get("cols", "")))
+
+    @classmethod
+    def _invalidate_results(cls, ticker: str | None, interval: str, start: int | None = None, end: int | None = None):
+        """Drop cached select_klines results overlapping klines written by `Database` or `AsyncDatabase`.
+
+        Runs whatever `result_cache_maxbytes` is, as results on redis may have been cached by other processes.
+        """
+        try:
+            Cache()
+            Cache.invalidate_query_results(ticker, interval, start, end)
+        except Exception:
+            logger.exception(f"Error on invalidate cached klines of ({ticker}, {interval}).")
+            raise
+
+    def select_klines(
+        self,
+        ticker: str,
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+        **kwargs,
+    ):
+        """Select klines of a ticker.
+
+        Args:
+            ticker: ticker of klines.
+            interval: interval of klines.
+            from_datetime: single datetime on any type
+            between_datetimes: tuple of datetimes on any type
+            kwargs:
+                returns: "model", "dict", "tuple" or "numpy" (structured array ordered by open_time).
+                cols: list of columns returned on "dict", "tuple" and "numpy" modes.
+
+        Numpy results of ranges fully in the past are served from redis when `result_cache_maxbytes` is set.
+
+        """
+        returns = kwargs.get("returns", "model")
+        symbol_id = self.symbol_id(ticker, create=False)
+        stmt = self._select_klines_stmt(symbol_id, interval, from_datetime, between_datetimes, **kwargs)
+
+        cache_key = (
+            None if from_datetime != "" else self._result_cache_key(ticker, interval, between_datetimes, **kwargs)
+        )
+        if cache_key is not None:
+            try:
+                cached = Cache.get_query_result(cache_key)
+                if cached is not None:
+                    return cached
+            except Exception:
+                logger.warning(f"Error on get cached klines {cache_key}.")
 
         with self.session_factory() as session:
             result = session.execute(stmt)
@@ -126,9 +392,262 @@ class Database(metaclass=Singleton):
                     return result.scalars().all()
                 case "dict":
                     return [row._asdict() for row in result]
+                case "numpy":
+                    data = self._rows_to_numpy(result, result.keys())
+                    if cache_key is not None:
+                        try:
+                            Cache.save_query_result(cache_key, data, self.result_cache_maxbytes)
+                        except Exception:
+                            logger.warning(f"Error on save cached klines {cache_key}.")
+                    return data
+
+            return [tuple(row) for row in result]
+
+    def select_klines_many(
+        self,
+        tickers: list[str],
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+        **kwargs,
+    ) -> dict[str, np.ndarray]:
+        """Select klines of many tickers in a single query.
+
+        Args:
+            tickers: list of tickers of klines.
+            interval: interval of klines.
+            from_datetime: single datetime on any type
+            between_datetimes: tuple of datetimes on any type
+            kwargs:
+                cols: list of columns of arrays.
+
+        Returns:
+            dict with keys ticker and values with structured arrays ordered by open_time (empty if no kline found).
+
+        """
+        kwargs["returns"] = "numpy"
+        model = self.ModelMapping.get(interval)
+        symbol_ids = self.symbol_ids(tickers)
+        stmt = self._select_klines_stmt(list(symbol_ids.values()), interval, from_datetime, between_datetimes, **kwargs)
+        stmt = stmt.add_columns(model.symbol_id).order_by(None).order_by(model.symbol_id, model.open_time)
+
+        with self.session_factory() as session:
+            result = session.execute(stmt)
+            columns = list(result.keys())[:-1]
+            rows = result.all()
+
+        data = self._rows_to_numpy((row[:-1] for row in rows), columns)
+        klines = {ticker: data[:0] for ticker in tickers}
+        tickers_of = {symbol_id: ticker for ticker, symbol_id in symbol_ids.items()}
+        start = 0
+        for symbol_id, group in groupby(row[-1] for row in rows):
+            end = start + sum(1 for _ in group)
+            klines[tickers_of[symbol_id]] = data[start:end]
+            start = end
+
+        return klines
+
+    def iter_klines(
+        self,
+        ticker: str,
+        interval: str,
+        from_datetime: Any = "",
+        between_datetimes: tuple[Any, Any] = ("", ""),
+        chunk_size: int = 100_000,
+        **kwargs,
+    ) -> Iterator[np.ndarray]:
+        """Stream klines as structured arrays of at most `chunk_size` rows, ordered by open_time.
+
+        Rows come from a server-side cursor, so memory stays bounded whatever the selected range.
+        Accepts the same params of `select_klines` (returns is always "numpy").
+        """
+        kwargs["returns"] = "numpy"
+        symbol_id = self.symbol_id(ticker, create=False)
+        stmt = self._select_klines_stmt(symbol_id, interval, from_datetime, between_datetimes, **kwargs)
+
+        with self.__engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(stmt)
+            columns = list(result.keys())
+            while rows := result.fetchmany(chunk_size):
+                yield self._rows_to_numpy(rows, columns)
+
+    def select_missing_ranges(
+        self, ticker: str, interval: str, between_datetimes: tuple[Any, Any]
+    ) -> list[tuple[int, int]]:
+        """Find runs of missing klines of a ticker inside a datetime range, computed on database.
+
+        Args:
+            ticker: ticker of klines.
+            interval: interval of klines.
+            between_datetimes: tuple of datetimes on any type.
+
+        Returns:
+            list of (first, last) missing open_time in milliseconds, both inclusive.
+
+        """
+        model = self.ModelMapping.get(interval)
+        if model is None:
+            e = "Interval not available."
+            logger.exception(e)
+            raise Exception(e)
+
+        step = int(Timing.delta_intervals[interval].total_seconds() * 1000)
+        start = convert_any_to_timestamp(between_datetimes[0])
+        end = convert_any_to_timestamp(between_datetimes[1])
+        last = start + (end - start) // step * step
 
+        # sentinels one step outside the range turn leading and trailing gaps into regular ones.
+        stmt = text(
+            f"""
+            SELECT prev_time + :step AS gap_start, open_time - :step AS gap_end
+            FROM (
+                SELECT open_time, LAG(open_time) OVER (ORDER BY open_time) AS prev_time
+                FROM (
+                    SELECT open_time FROM {model.__tablename__}
+                    WHERE symbol_id = :symbol_id AND open_time BETWEEN :start AND :last
+                    UNION ALL SELECT CAST(:start AS BIGINT) - :step
+                    UNION ALL SELECT CAST(:last AS BIGINT) + :step
+                ) AS times
+            ) AS steps
+            WHERE open_time - prev_time > :step
+            ORDER BY gap_start
+            """
+        )
+
+        with self.session_factory() as session:
+            params = {"symbol_id": self.symbol_id(ticker, create=False), "start": start, "last": last, "step": step}
+            result = session.execute(stmt, params)
             return [tuple(row) for row in result]
 
+    def get_ingest_watermark(self, ticker: str, interval: str) -> int | None:
+        """Last fully ingested open_time (ms) of a ticker and interval, stored on app_config."""
+        stmt = select(m.AppConfig.value).where(m.AppConfig.key == f"ingest_watermark:{ticker}:{interval}")
+        with self.session_factory() as session:
+            value = session.execute(stmt).scalar()
+        return None if value is None else int(value)
+
+    def set_ingest_watermark(self, ticker: str, interval: str, open_time: int) -> bool:
+        """Store the last fully ingested open_time (ms) of a ticker and interval. The watermark never moves back."""
+        stmt = text(
+            """
+            INSERT INTO app_config (key, value) VALUES (:key, :value)
+            ON CONFLICT (key) DO UPDATE SET value = GREATEST(app_config.value::bigint, EXCLUDED.value::bigint)::text
+            """
+        )
+        with self.session_factory() as session:
+            session.execute(stmt, {"key": f"ingest_watermark:{ticker}:{interval}", "value": str(int(open_time))})
+            session.commit()
+        return True
+
+    def rollup_klines(self, ticker: str, intervals: list[str] | None = None, from_datetime: Any = "") -> dict[str, int]:
+        """Build klines of higher intervals from 1m klines of a ticker, aggregated on database.
+
+        Only buckets holding every 1m kline are written. The open_time of the first bucket missing 1m klines (or the
+        open_time following the last built bucket) is stored on app_config as a watermark, so each call aggregates
+        the 1m klines inserted since the previous one and retries buckets whose gaps were filled.
+
+        Args:
+            ticker: ticker of klines.
+            intervals: intervals to build, from 3m to 1d. Defaults to all of them.
+            from_datetime: single datetime on any type to rebuild from, instead of the stored watermark.
+
+        Returns:
+            dict with keys interval and values with number of klines inserted.
+
+        """
+        intervals = intervals or Timing.klines_intervals_available[2:]
+        if any(i not in self.ModelMapping or i in ["1s", "1m"] for i in intervals):
+            e = f"Rollup not available to intervals {intervals}."
+            logger.error(e)
+            raise Exception(e)
+
+        source = m.Klines_1m.__tablename__
+        symbol_id = self.symbol_id(ticker, create=False)
+        minute = 60_000
+        inserted, rolled = {}, []
+
+        with self.__engine.begin() as conn:
+            first, last = conn.execute(
+                select(func.min(m.Klines_1m.open_time), func.max(m.Klines_1m.open_time)).where(
+                    m.Klines_1m.symbol_id == symbol_id
+                )
+            ).one()
+
+            for interval in intervals:
+                table = self.ModelMapping[interval].__tablename__
+                step = int(Timing.delta_intervals[interval].total_seconds() * 1000)
+                key = f"rollup_watermark:{ticker}:{interval}"
+
+                if from_datetime != "":
+                    start = convert_any_to_timestamp(from_datetime)
+                else:
+                    start = int(conn.execute(select(m.AppConfig.value).where(m.AppConfig.key == key)).scalar() or 0)
+                start -= start % step
+                # buckets starting before the first 1m kline are never complete, so they don't hold the watermark back.
+                if first is not None:
+                    start = max(start, first + -first % step)
+                end = 0 if last is None else (last + minute) - (last + minute) % step
+
+                if end <= start:
+                    inserted[interval] = 0
+                    continue
+
+                stmt = text(
+                    f"""
+                    INSERT INTO {table} (
+                        symbol_id, open_time, open, high, low, close, base_asset_volume, close_time,
+                        quote_asset_volume, number_of_trades, taker_buy_base_asset_volume, taker_buy_quote_asset_volume
+                    )
+                    SELECT symbol_id, bucket,
+                        (array_agg(open ORDER BY open_time))[1], max(high), min(low),
+                        (array_agg(close ORDER BY open_time DESC))[1], sum(base_asset_volume), bucket + :step - 1,
+                        sum(quote_asset_volume), sum(number_of_trades), sum(taker_buy_base_asset_volume),
+                        sum(taker_buy_quote_asset_volume)
+                    FROM (
+                        SELECT *, open_time - open_time % :step AS bucket FROM {source}
+                        WHERE symbol_id = :symbol_id AND open_time >= :start AND open_time < :end
+                    ) AS klines
+                    GROUP BY symbol_id, bucket
+                    HAVING count(*) = :step / {minute}
+                    ON CONFLICT DO NOTHING
+                    """
+                )
+                params = {"symbol_id": symbol_id, "start": start, "end": end, "step": step}
+                result = conn.execute(stmt, params)
+                inserted[interval] = result.rowcount
+                rolled.append((interval, start, end))
+
+                # the watermark stops at the first incomplete bucket, so it is built once its 1m klines arrive.
+                incomplete = text(
+                    f"""
+                    SELECT min(buckets.bucket)
+                    FROM generate_series(CAST(:start AS bigint), CAST(:end AS bigint) - :step, :step) AS buckets(bucket)
+                    LEFT JOIN (
+                        SELECT open_time - open_time % :step AS bucket, count(*) AS n FROM {source}
+                        WHERE symbol_id = :symbol_id AND open_time >= :start AND open_time < :end
+                        GROUP BY 1
+                    ) AS klines USING (bucket)
+                    WHERE coalesce(klines.n, 0) < :step / {minute}
+                    """
+                )
+                value = conn.execute(incomplete, params).scalar()
+                value = str(end if value is None else value)
+                watermark = insert(m.AppConfig).values(key=key, value=value)
+                conn.execute(watermark.on_conflict_do_update(index_elements=["key"], set_={"value": value}))
+
+        for interval, start, end in rolled:
+            self._invalidate_results(ticker, interval, start, end)
+
+        logger.info(f"Rollup of {ticker} klines: {inserted}")
+        return inserted
+
+    @staticmethod
+    def _klines_to_insert(symbol_id: int, data: np.ndarray | list[Dict]) -> list[Dict]:
+        if isinstance(data, np.ndarray):
+            columns = ("symbol_id",) + data.dtype.names
+            return [dict(zip(columns, (symbol_id,) + row)) for row in data.tolist()]
+        return [{"symbol_id": symbol_id, **row} for row in data]
+
     def insert_klines(self, ticker: str, interval: str, data: np.ndarray | list[Dict]) -> bool:
         model_class = self.ModelMapping.get(interval)
 
@@ -137,21 +656,76 @@ class Database(metaclass=Singleton):
             return False
 
         try:
-            if isinstance(data, np.ndarray):
-                columns = ("ticker",) + data.dtype.names
-                data_to_insert = [dict(zip(columns, (ticker,) + row)) for row in data.tolist()]
-            else:
-                data_to_insert = [{"ticker": ticker, **row} for row in data]
+            data_to_insert = self._klines_to_insert(self.symbol_id(ticker), data)
+            times = [row["open_time"] for row in data_to_insert]
+            if times:
+                self.ensure_partitions(interval, min(times), max(times))
 
             stmt = insert(model_class).values(data_to_insert)
-            stmt = stmt.on_conflict_do_nothing(index_elements=["ticker", "open_time"])
+            stmt = stmt.on_conflict_do_nothing(index_elements=["symbol_id", "open_time"])
 
             with self.session_factory() as session:
                 session.execute(stmt)
                 session.commit()
 
+            if times:
+                self._invalidate_results(ticker, interval, min(times), max(times))
             return True
 
         except Exception as e:
             logger.exception(f"Error klines insertion ({ticker}, {interval}): {e}")
             raise e
+
+    def copy_klines(self, ticker: str, interval: str, data: np.ndarray | list[Dict], chunk_size: int = 50_000) -> bool:
+        """Bulk version of `insert_klines` based on PostgreSQL COPY.
+
+        Rows are streamed into a temporary staging table and merged with ON CONFLICT DO NOTHING.
+        Structured arrays are sent as row tuples, so no dict is built per row.
+
+        Args:
+            ticker: ticker of klines.
+            interval: interval of klines.
+            data: structured array or list of dicts holding every kline column of the table (symbol_id excluded).
+            chunk_size: rows converted to python tuples at a time.
+
+        Returns:
+            bool that show success of operation.
+
+        """
+        model_class = self.ModelMapping.get(interval)
+
+        if not model_class:
+            logger.error(f"Models not found to interval {interval}.")
+            return False
+
+        table = model_class.__tablename__
+        cols = [c.name for c in model_class.__table__.columns if c.name != "symbol_id"]
+        symbol_id = self.symbol_id(ticker)
+        staging = f"staging_{table}"
+
+        if len(data):
+            times = data["open_time"] if isinstance(data, np.ndarray) else [row["open_time"] for row in data]
+            self.ensure_partitions(interval, int(min(times)), int(max(times)))
+
+        try:
+            with self.__engine.begin() as conn:
+                with conn.connection.driver_connection.cursor() as cursor:
+                    cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {table}) ON COMMIT DROP")
+                    with cursor.copy(f"COPY {staging} (symbol_id, {', '.join(cols)}) FROM STDIN") as copy:
+                        if isinstance(data, np.ndarray):
+                            for start in range(0, data.size, chunk_size):
+                                for row in data[cols][start : start + chunk_size].tolist():
+                                    copy.write_row((symbol_id, *row))
+                        else:
+                            getter = itemgetter(*cols)
+                            for row in data:
+                                copy.write_row((symbol_id, *getter(row)))
+                    cursor.execute(f"INSERT INTO {table} SELECT * FROM {staging} ON CONFLICT DO NOTHING")
+
+            if len(data):
+                self._invalidate_results(ticker, interval, int(min(times)), int(max(times)))
+            return True
+
+        except Exception as e:
+            logger.exception(f"Error klines copy ({ticker}, {interval}): {e}")
+            raise e
@@ -1,5 +1,5 @@
-from sqlalchemy import BigInteger
-from sqlalchemy.orm import DeclarativeBase, Mapped, MappedAsDataclass, mapped_column, registry
+from sqlalchemy import BigInteger, ForeignKey, Index, SmallInteger
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedAsDataclass, declared_attr, mapped_column, registry
 
 main_registry = registry()
 
@@ -16,10 +16,19 @@ class AppConfig(Base):
     value: Mapped[str]
 
 
+class Symbol(Base):
+    """Dictionary of tickers, klines tables reference them by their small integer id."""
+
+    __tablename__ = "symbols"
+
+    id: Mapped[int] = mapped_column(SmallInteger, init=False, primary_key=True)
+    ticker: Mapped[str] = mapped_column(unique=True)
+
+
 class Bkline(Base, kw_only=True):
     __abstract__ = True
 
-    ticker: Mapped[str] = mapped_column(primary_key=True)
+    symbol_id: Mapped[int] = mapped_column(SmallInteger, ForeignKey("symbols.id"), primary_key=True)
     open_time: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     open: Mapped[float]
     high: Mapped[float]
@@ -33,11 +42,24 @@ class Bkline(Base, kw_only=True):
     taker_buy_quote_asset_volume: Mapped[float]
 
 
-class Klines_1s(Bkline):
+class PartitionedBkline(Bkline):
+    """Klines tables partitioned by month of open_time. Partitions are managed by `Database.ensure_partitions`."""
+
+    __abstract__ = True
+
+    @declared_attr.directive
+    def __table_args__(cls):
+        return (
+            Index(f"ix_{cls.__tablename__}_open_time_brin", "open_time", postgresql_using="brin"),
+            {"postgresql_partition_by": "RANGE (open_time)"},
+        )
+
+
+class Klines_1s(PartitionedBkline):
     __tablename__ = "klines_1s"
 
 
-class Klines_1m(Bkline):
+class Klines_1m(PartitionedBkline):
     __tablename__ = "klines_1m"
 
 
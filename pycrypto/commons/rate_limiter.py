@@ -0,0 +1,114 @@
+import logging
+import time
+
+from pycrypto.commons.cache import Cache
+
+logger = logging.getLogger("app")
+
+# Token bucket of KEYS[1] refilled by ARGV[2] tokens per minute up to ARGV[1], on redis clock.
+# Takes ARGV[3] tokens and returns 0, or returns the ms to wait until they are available (nothing is taken).
+ACQUIRE_SCRIPT = """
+local capacity, per_minute, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts", "blocked_until")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+if blocked_until > now then
+    return blocked_until - now
+end
+
+tokens = math.min(capacity, tokens + (now - ts) * per_minute / 60000)
+local wait = 0
+if tokens < cost then
+    wait = math.ceil((cost - tokens) * 60000 / per_minute)
+else
+    tokens = tokens - cost
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], 120000)
+return wait
+"""
+
+# Caps the tokens of KEYS[1] to ARGV[1] (weight left on the exchange window) and blocks it for ARGV[2] ms.
+SYNC_SCRIPT = """
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local remaining, block_ms = tonumber(ARGV[1]), tonumber(ARGV[2])
+
+local tokens = tonumber(redis.call("HGET", KEYS[1], "tokens"))
+if tokens == nil or remaining < tokens then
+    redis.call("HSET", KEYS[1], "tokens", tostring(math.max(remaining, 0)), "ts", now)
+end
+if block_ms > 0 then
+    redis.call("HSET", KEYS[1], "blocked_until", now + block_ms)
+end
+redis.call("PEXPIRE", KEYS[1], math.max(120000, block_ms))
+return 0
+"""
+
+
+class RateLimiter:
+    """Token bucket of Binance request weight, shared by every thread and process through redis.
+
+    Callers `acquire` the weight of an endpoint before each request. Weights used by the exchange, read from
+    response headers, are fed back with `sync`, and 429/418 responses `block` every caller until the ban ends.
+
+    Args:
+        key: redis key of the bucket.
+        capacity: max weight per minute (REQUEST_WEIGHT limit of exchange).
+        margin: fraction of capacity kept unused, for requests of other tools on the same IP.
+
+    """
+
+    # https://developers.binance.com/docs/binance-spot-api-docs/rest-api. Unknown endpoints weight 1.
+    endpoint_weights = {
+        "klines": 2,
+        "exchange_info": 20,
+        "trade_fee": 1,
+        "user_asset": 5,
+        "new_order": 1,
+        "new_order_test": 1,
+    }
+
+    def __init__(self, key: str = "binance:request_weight", capacity: int = 6000, margin: float = 0.1):
+        Cache()
+        self.key = key
+        self.capacity = int(capacity * (1 - margin))
+        self._acquire = Cache._cache.register_script(ACQUIRE_SCRIPT)
+        self._sync = Cache._cache.register_script(SYNC_SCRIPT)
+
+    def acquire(self, endpoint: str = "", weight: int | None = None, timeout: float | None = None) -> float:
+        """Wait until the weight of a request is available and take it.
+
+        Args:
+            endpoint: name of endpoint method on binance client, e.g. "klines".
+            weight: weight of request, overrides the weight of endpoint.
+            timeout: max seconds to wait. None waits as long as needed.
+
+        Returns:
+            seconds waited.
+
+        """
+        cost = min(weight or self.endpoint_weights.get(endpoint, 1), self.capacity)
+        waited = 0.0
+        while wait_ms := int(self._acquire(keys=[self.key], args=[self.capacity, self.capacity, cost])):
+            if timeout is not None and waited + wait_ms / 1000 > timeout:
+                e = f"Rate limit of {self.key} would wait more than {timeout}s for {endpoint or weight}."
+                logger.error(e)
+                raise Exception(e)
+            time.sleep(wait_ms / 1000)
+            waited += wait_ms / 1000
+
+        return waited
+
+    def sync(self, used_weight: int):
+        """Align the bucket with the weight used on the current minute reported by exchange."""
+        self._sync(keys=[self.key], args=[self.capacity - int(used_weight), 0])
+
+    def block(self, seconds: float):
+        """Stop every caller for `seconds`, e.g. Retry-After of a 429/418 response."""
+        logger.warning(f"Rate limit of {self.key} blocked for {seconds}s.")
+        self._sync(keys=[self.key], args=[0, int(seconds * 1000)])
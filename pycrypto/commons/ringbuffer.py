@@ -0,0 +1,161 @@
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pycrypto.commons.cache import Cache
+from pycrypto.commons.utils import BrokerUtils
+
+logger = logging.getLogger("app")
+
+
+class RingBufferStore:
+    """Single-host kline storage on fixed-size memory-mapped ring buffers.
+
+    Each stream (same keys used on redis, e.g. btcusdt@kline_1m:closed) is a file holding a small header and
+    `capacity` records of `Cache.record_dtype`. One process writes a stream and any process can map it read-only.
+    Set it on `Cache.kline_backend` to serve the `Cache` kline API from it.
+
+    Args:
+        path: directory of the ring files. Defaults to env RINGBUFFER_PATH or /dev/shm/pycrypto.
+        capacity: records kept per interval. Defaults to `BrokerUtils.websocket_opened_maxlen`.
+
+    """
+
+    # header int64 slots: total records ever written, capacity of the ring and a sequence counter that is odd
+    # while the writer changes records (a seqlock), so readers can detect and retry torn copies.
+    _header_dtype = np.dtype([("count", "i8"), ("capacity", "i8"), ("seq", "i8")])
+    _header_size = 64
+    read_retries = 3
+
+    def __init__(self, path: str | Path | None = None, capacity: dict[str, int] | None = None):
+        self.path = Path(path or os.getenv("RINGBUFFER_PATH", "/dev/shm/pycrypto"))
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity or BrokerUtils.websocket_opened_maxlen
+        # maps by stream with the inode they were opened from, as another process may delete and recreate a file.
+        self._rings: dict[str, tuple[int, np.memmap, np.memmap]] = {}
+
+    def _file(self, redis_key: str) -> Path:
+        return self.path / f"{redis_key}.ring"
+
+    def _create(self, file: Path, interval: str):
+        # the header is complete before the file is visible, so readers never map a ring without its capacity.
+        capacity = self.capacity[interval]
+        header = np.zeros(1, dtype=self._header_dtype)
+        header["capacity"] = capacity
+        tmp = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(header.tobytes())
+            f.truncate(self._header_size + capacity * Cache.record_dtype.itemsize)
+        os.replace(tmp, file)
+
+    def _open(self, redis_key: str, interval: str, create=False) -> tuple[np.memmap, np.memmap] | None:
+        file = self._file(redis_key)
+        try:
+            inode = file.stat().st_ino
+        except FileNotFoundError:
+            self._rings.pop(redis_key, None)
+            if not create:
+                return None
+            self._create(file, interval)
+            inode = file.stat().st_ino
+
+        if redis_key in self._rings and self._rings[redis_key][0] == inode:
+            return self._rings[redis_key][1:]
+
+        header = np.memmap(file, dtype=self._header_dtype, mode="r+", shape=(1,))
+        data = np.memmap(
+            file, dtype=Cache.record_dtype, mode="r+", offset=self._header_size, shape=(int(header["capacity"][0]),)
+        )
+        self._rings[redis_key] = inode, header, data
+        return header, data
+
+    def view(self, ticker: str, interval: str, closed_klines=True) -> tuple[np.memmap, int] | None:
+        """Zero-copy access: the raw ring and the total of records written (the next slot is count % capacity).
+
+        Unlike `get_klines`, slots are not checked against concurrent writes.
+        """
+        redis_key, _ = Cache._stream_key((ticker, interval), closed_klines)
+        ring = self._open(redis_key, interval)
+        if ring is None:
+            return None
+        header, data = ring
+        return data, int(header["count"][0])
+
+    def append_klines(self, stream: Any, data: list[dict] | np.ndarray, closed_klines=True) -> bool:
+        redis_key, interval = Cache._stream_key(stream, closed_klines)
+        header, ring = self._open(redis_key, interval, create=True)
+        capacity = ring.size
+
+        if isinstance(data, np.ndarray):
+            records = np.empty(data.size, dtype=Cache.record_dtype)
+            for col in Cache.record_columns:
+                records[col] = data[col]
+        else:
+            records = np.array([Cache._kline_record(row) for row in data], dtype=Cache.record_dtype)
+
+        count, seq = int(header["count"][0]), int(header["seq"][0])
+        header["seq"] = seq + 1
+        try:
+            # an update of the last kline (opened klines) is written in place instead of taking a new slot.
+            if count and records.size and ring[(count - 1) % capacity]["open_time"] == records[0]["open_time"]:
+                ring[(count - 1) % capacity] = records[0]
+                records = records[1:]
+
+            records = records[-capacity:]
+            slots = (count + np.arange(records.size)) % capacity
+            ring[slots] = records
+            header["count"] = count + records.size
+        finally:
+            header["seq"] = seq + 2
+        return True
+
+    def append_kline(self, stream: Any, data: dict, closed_klines=True) -> bool:
+        return self.append_klines(stream, [data], closed_klines)
+
+    def get_klines(
+        self, ticker: str, interval: str, min_range="-", max_range="+", closed_klines=True, limit=None
+    ) -> np.ndarray:
+        """Last `limit` records, oldest first, optionally filtered by open_time like redis stream ids."""
+        redis_key, _ = Cache._stream_key((ticker, interval), closed_klines or interval == "1s")
+        ring = self._open(redis_key, interval)
+        if ring is None:
+            return np.empty(0, dtype=Cache.record_dtype)
+
+        header, data = ring
+        capacity = data.size
+        limit = min(limit or capacity, capacity)
+        for _ in range(self.read_retries):
+            seq = int(header["seq"][0])
+            if seq % 2:
+                time.sleep(0)
+                continue
+            count = int(header["count"][0])
+            size = min(limit, count)
+            result = data[(count - size + np.arange(size)) % capacity]
+            # the copy is consistent only if no write started or ended while it was taken.
+            if int(header["seq"][0]) == seq:
+                break
+        else:
+            e = f"Ring {redis_key} is being written faster than it can be read."
+            logger.error(e)
+            raise Exception(e)
+
+        if min_range != "-":
+            result = result[result["open_time"] >= int(str(min_range).split("-")[0])]
+        if max_range != "+":
+            result = result[result["open_time"] <= int(str(max_range).split("-")[0])]
+        return result
+
+    def check_key_exists(self, ticker: str, interval: str, closed_klines=True) -> bool:
+        view = self.view(ticker, interval, closed_klines)
+        return view is not None and view[1] > 0
+
+    def delete_stream(self, ticker: str, interval: str, closed_klines=True) -> bool:
+        redis_key, _ = Cache._stream_key((ticker, interval), closed_klines)
+        self._rings.pop(redis_key, None)
+        self._file(redis_key).unlink(missing_ok=True)
+        return True
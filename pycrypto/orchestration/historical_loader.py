@@ -1,16 +1,16 @@
 """Module responsable to implements Loader class who can add historical klines into our database."""
 
 import logging
-import time as ts
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, time
+from itertools import islice
 from typing import Any, Tuple
 
-import numpy as np
 from tqdm import tqdm
 
 from pycrypto import db
 from pycrypto.broker import Broker
-from pycrypto.commons.utils import Timing, convert_any_to_datetime, get_timestamp_range_list
+from pycrypto.commons.utils import Timing, convert_any_to_datetime
 
 logger = logging.getLogger("app")
 
@@ -77,6 +77,93 @@ class Loader:
 
         return start, end
 
+    def __last_closed_open_time(self, data: Any) -> int | None:
+        """Wrapper for find the last closed open_time of klines, used as ingest watermark.
+
+        Args:
+            data: klines inserted, list of dicts or structured array
+
+        Returns:
+            open_time in ms, or None when no kline is closed
+
+        """
+        now = int(datetime.now().timestamp() * 1000)
+        closed = [int(row["open_time"]) for row in data if row["close_time"] < now]
+        return max(closed) if closed else None
+
+    def __fetch_page(self, ticker: str, interval: str, start: datetime, limit: int | None) -> Any:
+        """Wrapper for download one page of klines, run by fetch workers.
+
+        Args:
+            ticker: string of ticker coin
+            interval: interval of klines
+            start: open_time of first kline
+            limit: number of klines of the last page of an interval, None for full pages
+
+        Returns:
+            klines of page
+
+        """
+        if limit is None:
+            return self.br.get_klines(ticker, interval, start)
+        return self.br.get_klines(ticker, interval, start, as_dict=True, limit=limit)
+
+    def __run_pipeline(
+        self, ticker: str, pages: list, workers: int, max_pending: int, verbose: bool, watermarked: set[str]
+    ):
+        """Wrapper for download pages on a pool of fetch workers while the caller thread inserts them.
+
+        At most `max_pending` pages are in flight, so memory stays bounded while downloads and inserts overlap.
+        Pages complete out of order, so the watermark of an interval only moves over its contiguous inserted pages,
+        and only for intervals in `watermarked`, whose pages continue the stored watermark.
+
+        Args:
+            ticker: string of ticker coin
+            pages: list of (interval, index on interval, start, limit)
+            workers: number of fetch workers
+            max_pending: max number of pages not inserted yet
+            verbose: bool to decide about logging
+            watermarked: intervals whose ingest watermark is moved by this run
+
+        Returns:
+            None
+
+        """
+        process = tqdm(total=len(pages), desc="Loading klines ...", unit="page") if verbose else None
+        inserted: dict[str, dict[int, int | None]] = {page[0]: {} for page in pages}
+        next_page = dict.fromkeys(inserted, 0)
+        todo = iter(pages)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loader-fetch") as executor:
+            pending = {}
+            try:
+                while True:
+                    for page in islice(todo, max_pending - len(pending)):
+                        pending[executor.submit(self.__fetch_page, ticker, page[0], page[2], page[3])] = page
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        interval, n, _, _ = pending.pop(future)
+                        data = future.result()
+                        db.copy_klines(ticker, interval, data)
+
+                        inserted[interval][n] = self.__last_closed_open_time(data)
+                        watermark = None
+                        while next_page[interval] in inserted[interval]:
+                            watermark = inserted[interval].pop(next_page[interval]) or watermark
+                            next_page[interval] += 1
+                        if watermark is not None and interval in watermarked:
+                            db.set_ingest_watermark(ticker, interval, watermark)
+
+                        if process is not None:
+                            process.update(1)
+            except Exception:
+                for future in pending:
+                    future.cancel()
+                raise
+
     def check_missing_data(
         self,
         ticker: str,
@@ -96,7 +183,7 @@ class Loader:
                 verbose: bool to decide about logging
 
         Returns:
-            dict with keys interval and values with list of missing timestamps
+            dict with keys interval and values with list of (first, last) missing timestamps runs, in seconds
 
         """
         verbose = kwargs.get("verbose", False)
@@ -105,16 +192,11 @@ class Loader:
 
         remaining_timestamps = {}
         for i in intervals[::-1]:
-            timestamp_range = get_timestamp_range_list(start, end, i)
-            timestamps_saved = [
-                int(i[0] / 1000)
-                for i in db.select_klines(
-                    ticker, i, between_datetimes=(start, end), cols=["open_time"], returns="tuple"
-                )
+            remaining_timestamps[i] = [
+                (int(first / 1000), int(last / 1000))
+                for first, last in db.select_missing_ranges(ticker, i, between_datetimes=(start, end))
             ]
 
-            remaining_timestamps[i] = np.setdiff1d(timestamp_range, timestamps_saved, assume_unique=True).tolist()
-
         return remaining_timestamps
 
     def dump_klines_into_db(
@@ -134,6 +216,10 @@ class Loader:
             between_datetimes: tuple of datetimes on any type
             kwargs:
                 verbose: bool to decide about logging
+                rollup: bool to download only 1s/1m klines and build the other intervals from 1m on database
+                incremental: bool to start each interval from its ingest watermark, when it is after the start
+                workers: number of threads downloading pages of klines concurrently
+                max_pending: max number of pages downloaded or being downloaded and not inserted yet
 
         Returns:
             bool that show success or error of operation
@@ -145,29 +231,38 @@ class Loader:
 
             start, end = self.__common_datetime_conversions(intervals, from_datetime, between_datetimes, verbose)
 
-            for i in intervals[::-1]:
+            rollup_intervals = [i for i in intervals if i not in ["1s", "1m"]] if kwargs.get("rollup", False) else []
+            download_intervals = [i for i in intervals if i not in rollup_intervals]
+            if rollup_intervals and "1m" not in download_intervals:
+                download_intervals.append("1m")
+
+            # pages of every interval are (interval, index on interval, start, limit).
+            pages, watermarked = [], set()
+            for i in download_intervals[::-1]:
                 delta = Timing.delta_intervals[i]
-                intervals_between_datetimes = int((end - start) / delta)
+                interval_start = start
+                watermark = db.get_ingest_watermark(ticker, i)
+                if watermark is not None and kwargs.get("incremental", False):
+                    interval_start = max(start, convert_any_to_datetime(watermark) + delta)
+                if interval_start >= end:
+                    continue
+                # a run starting after the watermark leaves a gap behind it, so it can't move the watermark.
+                if watermark is None or interval_start <= convert_any_to_datetime(watermark) + delta:
+                    watermarked.add(i)
+
+                intervals_between_datetimes = int((end - interval_start) / delta)
                 full_loops, final_round = divmod(intervals_between_datetimes, 1000)
-                if verbose:
-                    process = tqdm(total=full_loops + 1, desc=f"Loading {i} interval ...", unit="unit")
+                pages += [(i, n, interval_start + n * 1000 * delta, None) for n in range(full_loops)]
+                pages.append((i, full_loops, interval_start + full_loops * 1000 * delta, final_round))
 
-                date_aux = start
-                for _ in range(full_loops):
-                    data = self.br.get_klines(ticker, i, date_aux)
-                    db.insert_klines(ticker, i, data)
-
-                    date_aux += 1000 * delta
-                    if full_loops > 60:
-                        ts.sleep(1)
-
-                    if verbose:
-                        process.update(1)
+            self.__run_pipeline(
+                ticker, pages, kwargs.get("workers", 4), kwargs.get("max_pending", 16), verbose, watermarked
+            )
 
-                data = self.br.get_klines(ticker, i, date_aux, as_dict=True, limit=final_round)
-                db.insert_klines(ticker, i, data)
-                if verbose:
-                    process.update(1)
+            if rollup_intervals:
+                # incremental runs only aggregate 1m klines after the rollup watermark.
+                rollup_start = "" if kwargs.get("incremental", False) else start
+                db.rollup_klines(ticker, rollup_intervals, from_datetime=rollup_start)
 
             return True
 
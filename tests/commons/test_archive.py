@@ -0,0 +1,23 @@
+import numpy as np
+
+from pycrypto import db
+from pycrypto.commons import KlineArchive
+
+
+def test_archive_must_read_exported_klines(cleaned_1d_table_scenario, tmp_path):
+    data = cleaned_1d_table_scenario
+    archive = KlineArchive(tmp_path)
+    expected = db.select_klines("BTCUSDT", "1d", returns="numpy")
+
+    months = archive.export("BTCUSDT", "1d", from_datetime=data[0]["open_time"], chunk_size=7)
+    assert months == archive.months("BTCUSDT", "1d")
+    np.testing.assert_array_equal(archive.read("BTCUSDT", "1d"), expected)
+
+    # exporting again merges with archived months without duplicates.
+    archive.export("BTCUSDT", "1d", between_datetimes=(data[10]["open_time"], data[20]["open_time"]))
+    np.testing.assert_array_equal(archive.read("BTCUSDT", "1d"), expected)
+
+    klines = archive.read("BTCUSDT", "1d", between_datetimes=(data[3]["open_time"], data[5]["open_time"]))
+    assert isinstance(klines.base, np.memmap)
+    np.testing.assert_array_equal(klines, expected[3:6])
+    assert archive.read("ETHUSDT", "1d").size == 0
@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+
+from pycrypto.commons import AsyncCache
+from tests.broker_wrapper import BrokerWrapper
+
+
+def test_async_cache_must_share_streams_with_cache():
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    AsyncCache()
+
+    async def scenario():
+        assert await AsyncCache.flushdb()
+        assert await AsyncCache.append_klines((ticker, interval), data)
+        assert await AsyncCache.check_key_exists(ticker, interval)
+        klines = await AsyncCache.get_klines(ticker, interval, limit=5, only_columns=["open_time"])
+        many = await AsyncCache.get_klines_many([(ticker, interval, 5)])
+        assert await AsyncCache.save("key-int", 1)
+        value = await AsyncCache.get("key-int")
+        assert await AsyncCache.flushdb()
+        assert await AsyncCache.get("key-int") is None
+        await AsyncCache.close()
+        return klines, many, value
+
+    klines, many, value = asyncio.run(scenario())
+    assert isinstance(klines, np.ndarray)
+    assert klines["open_time"][-1] == data[-1]["open_time"]
+    np.testing.assert_array_equal(many[(ticker, interval)]["open_time"], klines["open_time"])
+    assert value == 1
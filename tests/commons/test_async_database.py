@@ -0,0 +1,50 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from pycrypto import db
+from pycrypto.commons import AsyncDatabase, Cache, Database
+
+
+@pytest.mark.delete_db_data
+def test_async_database_must_share_tables_with_database(broker):
+    data = broker.get_klines("BTCUSDT", "1d", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1d"])
+    adb = AsyncDatabase(connection_str=db.connection_str)
+
+    async def scenario():
+        assert await adb.insert_klines("BTCUSDT", "1d", data[:10])
+        # concurrent queries on the same engine.
+        klines, dicts = await asyncio.gather(
+            adb.select_klines("BTCUSDT", "1d", returns="numpy"),
+            adb.select_klines("BTCUSDT", "1d", from_datetime=data[5]["open_time"], returns="dict"),
+        )
+        await adb.dispose()
+        return klines, dicts
+
+    klines, dicts = asyncio.run(scenario())
+    assert isinstance(klines, np.ndarray)
+    np.testing.assert_array_equal(klines, db.select_klines("BTCUSDT", "1d", returns="numpy"))
+    assert [row["open_time"] for row in dicts] == [row["open_time"] for row in data[5:10]]
+
+
+@pytest.mark.delete_db_data
+def test_async_database_inserts_must_invalidate_cached_results(broker, monkeypatch):
+    data = broker.get_klines("BTCUSDT", "1d", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1d"])
+    db.insert_klines("BTCUSDT", "1d", data[:10])
+    monkeypatch.setattr(Database, "result_cache_maxbytes", 10_000)
+    Cache().flushdb()
+
+    params = {"between_datetimes": (data[0]["open_time"], data[19]["open_time"]), "returns": "numpy"}
+    assert len(db.select_klines("BTCUSDT", "1d", **params)) == 10
+    adb = AsyncDatabase(connection_str=db.connection_str)
+
+    async def scenario():
+        assert await adb.insert_klines("BTCUSDT", "1d", data[10:20])
+        await adb.dispose()
+
+    asyncio.run(scenario())
+    assert len(db.select_klines("BTCUSDT", "1d", **params)) == 20
+    Cache.flushdb()
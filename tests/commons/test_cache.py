@@ -1,9 +1,11 @@
+import json
 from datetime import datetime
 
+import numpy as np
 import pytest
 
 from pycrypto.commons.cache import Cache
-from pycrypto.commons.utils import BrokerUtils
+from pycrypto.commons.utils import BrokerUtils, convert_data_to_numpy
 from tests.broker_wrapper import BrokerWrapper
 
 
@@ -17,6 +19,7 @@ def test_cache_must_delete_all_keys():
     [
         ("key-str", "value-str"),
         ("key-int", 123),
+        ("key-bool", True),
         ("key-float", 1.23),
         ("key-dict", {"value": 123}),
         ("key-list", [1, 2, 3]),
@@ -92,3 +95,189 @@ def test_cache_appendklines_must_satisfy_maxlen_criteria():
     assert 0.85 * env_maxlen <= len(Cache.get_klines(ticker, interval)) <= 1.15 * env_maxlen
 
     Cache.flushdb()
+
+
+def test_cache_binary_encoding_must_return_structured_array(monkeypatch):
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    monkeypatch.setattr(Cache, "encoding", "binary")
+    assert Cache.append_klines((ticker, interval), data)
+    klines = Cache.get_klines(ticker, interval)
+    assert isinstance(klines, np.ndarray)
+    assert klines.dtype == Cache.record_dtype
+    assert (np.diff(klines["open_time"]) > 0).all()
+    Cache.flushdb()
+
+
+def test_cache_binary_encoding_must_read_legacy_json_entries(monkeypatch):
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    assert Cache.append_klines((ticker, interval), data)
+    monkeypatch.setattr(Cache, "encoding", "binary")
+    klines = Cache.get_klines(ticker, interval)
+    assert klines["open_time"][-1] == data[-1]["open_time"]
+    Cache.flushdb()
+
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_cache_must_append_klines_from_numpy_array(monkeypatch, encoding):
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = convert_data_to_numpy(BrokerWrapper().get_klines(ticker, interval, start_time))
+    monkeypatch.setattr(Cache, "encoding", encoding)
+    assert Cache.append_klines((ticker, interval), data, batch_size=7)
+    assert Cache.check_key_exists(ticker, interval)
+    assert Cache.get_info_stream(ticker, interval)["last-generated-id"] == f"{data['open_time'][-1]}-0"
+    Cache.flushdb()
+
+
+def test_cache_json_encoding_must_encode_arrays_with_ticker_field():
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    rows = BrokerWrapper().get_klines(ticker, interval, start_time)
+    data = convert_data_to_numpy([{"ticker": ticker, **row} for row in rows])
+    assert [json.loads(fields["data"]) for fields in Cache.encode_klines(data[:3])] == [
+        {**dict(zip(data.dtype.names, row)), "ticker": ticker} for row in data[:3].tolist()
+    ]
+    assert Cache.append_klines((ticker, interval), data)
+    assert Cache.get_klines(ticker, interval)[0]["ticker"] == ticker
+    Cache.flushdb()
+
+
+def test_cache_get_klines_as_array_must_project_columns():
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    assert Cache.append_klines((ticker, interval), data)
+    klines = Cache.get_klines(ticker, interval, as_array=True, only_columns=["open_time", "close"])
+    assert klines.dtype.names == ("open_time", "close")
+    assert (np.diff(klines["open_time"]) > 0).all()
+    assert list(Cache.get_klines(ticker, interval, only_columns=["close"])[0].keys()) == ["close"]
+    Cache.flushdb()
+
+
+def test_cache_get_klines_many_must_return_one_array_per_stream():
+    Cache.flushdb()
+    start_time = datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines("BTCUSDT", "1h", start_time)
+    assert Cache.append_klines(("BTCUSDT", "1h"), data)
+    result = Cache.get_klines_many([("BTCUSDT", "1h", 10), ("ETHUSDT", "1h", 10)])
+    assert len(result[("BTCUSDT", "1h")]) == 10
+    assert len(result[("ETHUSDT", "1h")]) == 0
+    Cache.flushdb()
+
+
+def test_cache_must_save_and_get_many_keys():
+    Cache.flushdb()
+    values = {"key-int": 1, "key-dict": {"a": [1, 2]}, "key-datetime": datetime(2025, 12, 18, 8, 55, 00)}
+    assert Cache.save_many(values)
+    assert Cache.get_many([*values, "key-missing"]) == {**values, "key-missing": None}
+    Cache._cache.set("key-corrupted", "int:abc")
+    assert Cache.get_many(["key-int", "key-corrupted"]) == {"key-int": 1, "key-corrupted": None}
+    Cache.flushdb()
+
+
+def test_cache_l1_must_serve_incremental_reads(monkeypatch):
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    monkeypatch.setattr(Cache, "l1_maxsize", 2)
+    monkeypatch.setattr(Cache, "l1_stats", {"hits": 0, "misses": 0})
+    assert Cache.append_klines((ticker, interval), data[:-1])
+    first = Cache.get_klines(ticker, interval, as_array=True, limit=10)
+    assert Cache.append_kline((ticker, interval), data[-1])
+    second = Cache.get_klines(ticker, interval, as_array=True, limit=10)
+    assert Cache.l1_stats == {"hits": 1, "misses": 1}
+    assert second["open_time"][-1] == data[-1]["open_time"]
+    np.testing.assert_array_equal(first[1:], second[:-1])
+    Cache.flushdb()
+
+
+def test_cache_scan_keys_must_filter_by_type():
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    assert Cache.append_klines((ticker, interval), data)
+    assert Cache.save("btcusdt@config", 1)
+    assert sorted(Cache.scan_keys("btcusdt*")) == ["btcusdt@config", "btcusdt@kline_1h:closed"]
+    assert list(Cache.scan_keys("btcusdt*", _type="stream")) == ["btcusdt@kline_1h:closed"]
+    Cache.flushdb()
+
+
+def test_cache_hash_opened_mode_must_keep_only_current_kline(monkeypatch):
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    monkeypatch.setattr(Cache, "opened_mode", "hash")
+    for row in data[:5]:
+        assert Cache.append_kline((ticker, interval), {**row, "open_time": data[0]["open_time"]}, closed_klines=False)
+    assert Cache.get_open_kline(ticker, interval)["close"] == data[4]["close"]
+    assert not Cache.check_key_exists(ticker, interval, closed_klines=False)
+
+    monkeypatch.setattr(Cache, "encoding", "binary")
+    assert Cache.append_kline((ticker, interval), data[5], closed_klines=False)
+    assert Cache._cache.hkeys(f"{ticker.lower()}@kline_{interval}:current") == ["bin"]
+    assert Cache.get_open_kline(ticker, interval)["open_time"] == data[5]["open_time"]
+    assert Cache.delete_stream(ticker, interval, closed_klines=False)
+    assert Cache.get_open_kline(ticker, interval) is None
+
+
+def test_cache_resample_must_aggregate_complete_buckets(monkeypatch):
+    Cache.flushdb()
+    ticker, start_time = "BTCUSDT", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, "1m", start_time)[:120]
+    monkeypatch.setitem(Cache._maxlen, "1m", 1000)
+    assert Cache.append_klines((ticker, "1m"), data)
+
+    hours = Cache.resample(ticker, "1m", "1h")
+    first_hour = data[:60]
+    assert len(hours) == 2
+    assert hours[0]["open"] == float(first_hour[0]["open"])
+    assert hours[0]["close"] == float(first_hour[-1]["close"])
+    assert hours[0]["high"] == max(float(row["high"]) for row in first_hour)
+    assert hours[0]["number_of_trades"] == sum(row["number_of_trades"] for row in first_hour)
+    assert len(Cache.resample(ticker, "1m", "1h")) == 0
+    assert len(Cache.get_klines(ticker, "1h")) == 2
+    Cache.flushdb()
+
+
+def test_cache_resample_must_skip_buckets_missing_their_head(monkeypatch):
+    Cache.flushdb()
+    ticker, start_time = "BTCUSDT", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, "1m", start_time)[:120]
+    monkeypatch.setitem(Cache._maxlen, "1m", 1000)
+    # the stream starts mid-bucket, like a source trimmed by maxlen.
+    assert Cache.append_klines((ticker, "1m"), data[30:])
+
+    hours = Cache.resample(ticker, "1m", "1h")
+    assert len(hours) == 1
+    assert hours[0]["open_time"] == data[60]["open_time"]
+    assert hours[0]["open"] == float(data[60]["open"])
+    assert hours[0]["number_of_trades"] == sum(row["number_of_trades"] for row in data[60:])
+    Cache.flushdb()
+
+
+def test_cache_resample_must_build_buckets_across_source_windows():
+    Cache.flushdb()
+    ticker, start_time = "BTCUSDT", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, "1m", start_time)[:120]
+    assert Cache._maxlen["1m"] < 120
+    hours = []
+    for i in range(0, len(data), 30):
+        assert Cache.append_klines((ticker, "1m"), data[i : i + 30])
+        hours.extend(Cache.resample(ticker, "1m", "1h"))
+
+    assert len(hours) == 2
+    for hour, rows in zip(hours, (data[:60], data[60:])):
+        assert hour["open_time"] == rows[0]["open_time"]
+        assert hour["open"] == float(rows[0]["open"])
+        assert hour["close"] == float(rows[-1]["close"])
+        assert hour["low"] == min(float(row["low"]) for row in rows)
+        assert hour["number_of_trades"] == sum(row["number_of_trades"] for row in rows)
+    assert len(Cache.get_klines(ticker, "1h")) == 2
+
+    with pytest.raises(Exception):
+        Cache.resample(ticker, "1s", "1h", store=False)
+    Cache.flushdb()
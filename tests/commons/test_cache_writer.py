@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from pycrypto.commons import Cache, KlineWriter
+from tests.broker_wrapper import BrokerWrapper
+
+
+def test_kline_writer_must_flush_buffered_klines_on_close():
+    Cache.flushdb()
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    writer = KlineWriter(batch_size=10, flush_interval_ms=50)
+    writer.start()
+    for row in data[-20:]:
+        writer.put((ticker, interval), row)
+    writer.close()
+    assert writer.pending == 0
+    assert Cache.get_info_stream(ticker, interval)["last-generated-id"] == f"{data[-1]['open_time']}-0"
+    Cache.flushdb()
@@ -2,9 +2,11 @@ from typing import List
 
 import numpy as np
 import pytest
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 
 from pycrypto import db
+from pycrypto.commons import Cache, Database
 from pycrypto.commons.models_main import Klines_1d
 from pycrypto.commons.utils import BrokerUtils, convert_data_to_numpy
 
@@ -129,3 +131,186 @@ def test_dbclass_can_select_klines_without_datetime_params(cleaned_1d_table_scen
 
     assert isinstance(klines, List)
     np.testing.assert_array_equal(select_arr, data_arr)
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_can_copy_klines_from_numpy_and_dict(broker):
+    data = broker.get_klines("BTCUSDT", "1d", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1d"])
+    assert db.copy_klines("BTCUSDT", "1d", convert_data_to_numpy(data[:10]), chunk_size=3)
+    assert db.copy_klines("BTCUSDT", "1d", data)
+    assert len(db.select_klines("BTCUSDT", "1d")) == len(data)
+
+
+def test_dbclass_can_select_klines_as_numpy(cleaned_1d_table_scenario):
+    klines = db.select_klines("BTCUSDT", "1d", returns="numpy")
+    assert isinstance(klines, np.ndarray)
+    assert len(klines) == len(cleaned_1d_table_scenario)
+    assert (np.diff(klines["open_time"]) > 0).all()
+    assert db.select_klines("BTCUSDT", "1d", returns="numpy", cols=["open_time", "close"]).dtype.names == (
+        "open_time",
+        "close",
+    )
+
+
+def test_dbclass_iter_klines_must_yield_bounded_chunks(cleaned_1d_table_scenario):
+    chunks = list(db.iter_klines("BTCUSDT", "1d", from_datetime="2025-01-01 00:00:00", chunk_size=7))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    np.testing.assert_array_equal(
+        np.concatenate(chunks), db.select_klines("BTCUSDT", "1d", from_datetime="2025-01-01 00:00:00", returns="numpy")
+    )
+
+
+def test_dbclass_must_find_missing_ranges(cleaned_1d_table_scenario):
+    data = cleaned_1d_table_scenario
+    first, last, day = data[0]["open_time"], data[-1]["open_time"], 86_400_000
+    assert db.select_missing_ranges("BTCUSDT", "1d", (first, last)) == []
+    assert db.select_missing_ranges("BTCUSDT", "1d", (first - 2 * day, last + day)) == [
+        (first - 2 * day, first - day),
+        (last + day, last + day),
+    ]
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_must_create_and_drop_monthly_partitions(broker):
+    data = broker.get_klines("BTCUSDT", "1m", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1m"])
+    assert db.insert_klines("BTCUSDT", "1m", data)
+    assert db.drop_kline_partitions("1m", data[0]["open_time"]) == []
+    assert db.select_klines("BTCUSDT", "1m", returns="tuple", cols=["open_time"]) != []
+
+    removed = db.drop_kline_partitions("1m", "2100-01-01 00:00:00")
+    assert removed and all(name.startswith("klines_1m_y") for name in removed)
+    assert db.select_klines("BTCUSDT", "1m", returns="tuple", cols=["open_time"]) == []
+    # partitions are created again on next insert.
+    assert db.copy_klines("BTCUSDT", "1m", data)
+    assert len(db.select_klines("BTCUSDT", "1m", returns="tuple", cols=["open_time"])) == len(data)
+
+    # partitions dropped by another process, and children out of the monthly scheme, don't break inserts or retention.
+    with db.session_factory() as session:
+        for name in removed:
+            session.execute(text(f"DROP TABLE {name}"))
+        session.execute(text("CREATE TABLE klines_1m_default PARTITION OF klines_1m DEFAULT"))
+        session.commit()
+    assert db.insert_klines("BTCUSDT", "1m", data)
+    assert sorted(db.drop_kline_partitions("1m", "2100-01-01 00:00:00")) == sorted(removed)
+    with db.session_factory() as session:
+        session.execute(text("DROP TABLE klines_1m_default"))
+        session.commit()
+
+    with pytest.raises(Exception, match="not partitioned"):
+        db.drop_kline_partitions("1d", "2100-01-01 00:00:00")
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_rollup_must_match_binance_klines(broker):
+    minutes = broker.get_klines("BTCUSDT", "1m", "2025-01-01 00:00:00")
+    hours = broker.get_klines("BTCUSDT", "1h", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1m", "1h"])
+    db.insert_klines("BTCUSDT", "1m", minutes)
+    first = minutes[0]["open_time"]
+
+    assert db.rollup_klines("BTCUSDT", ["1h"], from_datetime=first) == {"1h": len(minutes) // 60}
+    # watermark already covers every 1m kline.
+    assert db.rollup_klines("BTCUSDT", ["1h"]) == {"1h": 0}
+
+    klines = db.select_klines("BTCUSDT", "1h", returns="numpy")
+    expected = convert_data_to_numpy(hours[: len(klines)])
+    for col in klines.dtype.names:
+        np.testing.assert_allclose(klines[col], expected[col].astype(klines[col].dtype))
+
+    with pytest.raises(Exception, match="Rollup not available"):
+        db.rollup_klines("BTCUSDT", ["1m"])
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_rollup_watermark_must_stop_at_incomplete_buckets(broker):
+    minutes = broker.get_klines("BTCUSDT", "1m", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1m", "1h"])
+    # the second hour misses one 1m kline.
+    db.insert_klines("BTCUSDT", "1m", minutes[:90] + minutes[91:])
+    first = minutes[0]["open_time"]
+
+    assert db.rollup_klines("BTCUSDT", ["1h"], from_datetime=first) == {"1h": len(minutes) // 60 - 1}
+    db.insert_klines("BTCUSDT", "1m", minutes[90:91])
+    assert db.rollup_klines("BTCUSDT", ["1h"]) == {"1h": 1}
+    assert len(db.select_klines("BTCUSDT", "1h")) == len(minutes) // 60
+    assert db.rollup_klines("BTCUSDT", ["1h"]) == {"1h": 0}
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_can_select_klines_of_many_tickers(broker):
+    data = broker.get_klines("BTCUSDT", "1d", "2025-01-01 00:00:00")
+    db.clean_kline_table(["1d"])
+    db.insert_klines("BTCUSDT", "1d", data)
+    db.insert_klines("ETHUSDT", "1d", data[:10])
+
+    klines = db.select_klines_many(["ETHUSDT", "BTCUSDT", "XRPUSDT"], "1d", from_datetime=data[0]["open_time"])
+    assert list(klines) == ["ETHUSDT", "BTCUSDT", "XRPUSDT"]
+    np.testing.assert_array_equal(klines["BTCUSDT"], db.select_klines("BTCUSDT", "1d", returns="numpy"))
+    np.testing.assert_array_equal(klines["ETHUSDT"], klines["BTCUSDT"][:10])
+    assert klines["XRPUSDT"].size == 0
+
+
+@pytest.mark.delete_db_data
+def test_dbclass_ingest_watermark_must_only_move_forward():
+    db.clean_kline_table(["1d"])
+    assert db.get_ingest_watermark("BTCUSDT", "1d") is None
+    assert db.set_ingest_watermark("BTCUSDT", "1d", 1735776000000)
+    assert db.set_ingest_watermark("BTCUSDT", "1d", 1735689600000)
+    assert db.get_ingest_watermark("BTCUSDT", "1d") == 1735776000000
+
+    db.clean_kline_table(["1d"])
+    assert db.get_ingest_watermark("BTCUSDT", "1d") is None
+
+
+def test_dbclass_must_store_klines_by_symbol_id(cleaned_1d_table_scenario, monkeypatch):
+    btc = db.symbol_id("BTCUSDT")
+    assert isinstance(btc, int)
+    assert db.symbol_ids(["BTCUSDT", "NOTLISTED"]) == {"BTCUSDT": btc}
+    assert db.symbol_id("NOTLISTED", create=False) is None
+
+    with db.session_factory() as session:
+        symbol_ids = session.execute(select(Klines_1d.symbol_id).distinct()).scalars().all()
+    assert symbol_ids == [btc]
+    assert db.select_klines("NOTLISTED", "1d") == []
+
+    # lookups of registered tickers by new processes must not take values of the SMALLINT id sequence.
+    last_value = "SELECT last_value FROM pg_sequences WHERE sequencename = 'symbols_id_seq'"
+    with db.session_factory() as session:
+        before = session.execute(text(last_value)).scalar()
+    for _ in range(3):
+        monkeypatch.setattr(db, "_symbols", {})
+        assert db.symbol_id("BTCUSDT") == btc
+    with db.session_factory() as session:
+        assert session.execute(text(last_value)).scalar() == before
+
+
+def test_dbclass_must_cache_results_of_closed_ranges(cleaned_1d_table_scenario, monkeypatch):
+    data = cleaned_1d_table_scenario
+    monkeypatch.setattr(Database, "result_cache_maxbytes", 2_500)
+    params = {"between_datetimes": (data[0]["open_time"], data[9]["open_time"]), "returns": "numpy"}
+    Cache().flushdb()
+
+    klines = db.select_klines("BTCUSDT", "1d", **params)
+    key = Cache.query_key("BTCUSDT", "1d", data[0]["open_time"], data[9]["open_time"], [])
+    np.testing.assert_array_equal(Cache.get_query_result(key), klines)
+
+    # an insert on the cached range drops the result, even from a writer which doesn't cache results.
+    monkeypatch.setattr(Database, "result_cache_maxbytes", 0)
+    db.insert_klines("BTCUSDT", "1d", data[5:6])
+    assert Cache.get_query_result(key) is None
+    monkeypatch.setattr(Database, "result_cache_maxbytes", 2_500)
+    np.testing.assert_array_equal(db.select_klines("BTCUSDT", "1d", **params), klines)
+
+    # results are evicted by least recent use beyond result_cache_maxbytes.
+    for i in range(10, 40, 10):
+        db.select_klines(
+            "BTCUSDT", "1d", between_datetimes=(data[i]["open_time"], data[i + 9]["open_time"]), returns="numpy"
+        )
+    assert Cache.get_query_result(key) is None
+
+    db.clean_kline_table(["1d"])
+    assert Cache.search_keys("klines_query:BTCUSDT:*") == []
+    assert Cache.search_keys("klines_query:index:*") == []
+    Cache.flushdb()
@@ -0,0 +1,29 @@
+import pytest
+
+from pycrypto.commons.cache import Cache
+from pycrypto.commons.rate_limiter import RateLimiter
+
+
+def test_rate_limiter_must_wait_when_weight_is_exhausted():
+    limiter = RateLimiter(key="test:request_weight", capacity=60, margin=0)
+    Cache.flushdb()
+
+    assert limiter.acquire(weight=50) == 0
+    # 10 tokens left refill at 1 token/s, so 15 tokens are ready after ~5s.
+    with pytest.raises(Exception):
+        limiter.acquire(weight=15, timeout=1)
+    assert 0 < limiter.acquire(weight=12) <= 3
+
+
+def test_rate_limiter_must_sync_and_block_from_exchange():
+    limiter = RateLimiter(key="test:request_weight", capacity=600, margin=0)
+    Cache.flushdb()
+
+    limiter.sync(used_weight=595)
+    with pytest.raises(Exception):
+        limiter.acquire(weight=20, timeout=1)
+    assert limiter.acquire("klines") == 0
+
+    limiter.block(5)
+    with pytest.raises(Exception):
+        limiter.acquire("klines", timeout=1)
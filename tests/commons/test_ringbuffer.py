@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from pycrypto.commons import AsyncCache, Cache, RingBufferStore
+from tests.broker_wrapper import BrokerWrapper
+
+
+def test_ringbuffer_must_keep_last_klines_in_order(tmp_path):
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    store = RingBufferStore(tmp_path, capacity={interval: 10})
+    assert store.append_klines((ticker, interval), data[:15])
+    assert store.append_klines((ticker, interval), data[15:20])
+
+    klines = store.get_klines(ticker, interval)
+    assert len(klines) == 10
+    np.testing.assert_array_equal(klines["open_time"], [row["open_time"] for row in data[10:20]])
+
+    ring, count = RingBufferStore(tmp_path).view(ticker, interval)
+    assert count == 15
+    assert ring.size == 10
+
+
+def test_cache_must_delegate_klines_to_ringbuffer(tmp_path, monkeypatch):
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    monkeypatch.setattr(Cache, "kline_backend", RingBufferStore(tmp_path))
+    assert Cache.append_klines((ticker, interval), data)
+    assert Cache.check_key_exists(ticker, interval)
+    assert Cache.get_klines(ticker, interval, as_array=True)["open_time"][-1] == data[-1]["open_time"]
+    assert Cache.delete_stream(ticker, interval)
+    assert not Cache.check_key_exists(ticker, interval)
+
+
+def test_ringbuffer_must_reopen_rings_recreated_by_other_stores(tmp_path):
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    writer, reader = RingBufferStore(tmp_path, capacity={interval: 10}), RingBufferStore(tmp_path)
+    assert writer.append_klines((ticker, interval), data[:5])
+    assert len(reader.get_klines(ticker, interval)) == 5
+
+    assert writer.delete_stream(ticker, interval)
+    assert not reader.check_key_exists(ticker, interval)
+    assert writer.append_klines((ticker, interval), data[5:7])
+    np.testing.assert_array_equal(
+        reader.get_klines(ticker, interval)["open_time"], [row["open_time"] for row in data[5:7]]
+    )
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_ringbuffer_must_not_return_records_being_written(tmp_path):
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    store = RingBufferStore(tmp_path, capacity={interval: 10})
+    assert store.append_klines((ticker, interval), data[:5])
+    header, _ = store._open(Cache._stream_key((ticker, interval))[0], interval)
+    assert header["seq"][0] == 2
+
+    # an odd sequence means a writer is changing the records.
+    header["seq"] += 1
+    with pytest.raises(Exception):
+        store.get_klines(ticker, interval)
+    header["seq"] += 1
+    assert len(store.get_klines(ticker, interval)) == 5
+
+
+def test_async_cache_must_delegate_klines_to_ringbuffer(tmp_path, monkeypatch):
+    ticker, interval, start_time = "BTCUSDT", "1h", datetime(2025, 1, 1, 0, 0, 0)
+    data = BrokerWrapper().get_klines(ticker, interval, start_time)
+    monkeypatch.setattr(Cache, "kline_backend", RingBufferStore(tmp_path))
+
+    async def scenario():
+        assert await AsyncCache.append_klines((ticker, interval), data)
+        assert await AsyncCache.check_key_exists(ticker, interval)
+        return await AsyncCache.get_klines(ticker, interval, limit=5)
+
+    klines = asyncio.run(scenario())
+    assert klines["open_time"][-1] == data[-1]["open_time"]
+    np.testing.assert_array_equal(Cache.get_klines(ticker, interval, as_array=True, limit=5), klines)
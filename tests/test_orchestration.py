@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 
+import numpy as np
 import pytest
 
 from pycrypto.commons.database import Database
@@ -27,3 +28,59 @@ def test_broker_loader_must_dump_data_in_kline_tables():
     Loader(broker=cbn).dump_klines_into_db("BTCUSDT", ["1d"], between_datetimes=(d_inicio, d_fim), verbose=True)
     qty_records = len(cbd.select_klines("BTCUSDT", "1d", between_datetimes=(d_inicio, d_fim)))
     assert qty_records == qty_intervals
+
+
+@pytest.mark.delete_db_data
+def test_loader_incremental_mode_must_start_from_watermark():
+    cbd = Database()
+    cbd.clean_kline_table(["1d"])
+
+    d_inicio = datetime(2025, 1, 1)
+    d_fim = datetime(2025, 1, 31)
+    loader = Loader(broker=cbn)
+    loader.dump_klines_into_db("BTCUSDT", ["1d"], between_datetimes=(d_inicio, d_fim))
+    last = cbd.select_klines("BTCUSDT", "1d", returns="numpy")["open_time"].max()
+    assert cbd.get_ingest_watermark("BTCUSDT", "1d") == last
+
+    # already ingested range, so no kline is requested again.
+    cbd.clean_kline_table(["1d"])
+    cbd.set_ingest_watermark("BTCUSDT", "1d", last)
+    loader.dump_klines_into_db("BTCUSDT", ["1d"], between_datetimes=(d_inicio, d_fim), incremental=True)
+    assert cbd.select_klines("BTCUSDT", "1d") == []
+
+
+@pytest.mark.delete_db_data
+def test_loader_must_not_move_watermark_over_gaps():
+    cbd = Database()
+    cbd.clean_kline_table(["1d"])
+
+    d_inicio = datetime(2025, 1, 1)
+    d_fim = datetime(2025, 1, 31)
+    loader = Loader(broker=cbn)
+    # the run starts days after the watermark, so the klines between them are still missing.
+    watermark = int((d_inicio - timedelta(days=5)).timestamp() * 1000)
+    cbd.set_ingest_watermark("BTCUSDT", "1d", watermark)
+    loader.dump_klines_into_db("BTCUSDT", ["1d"], between_datetimes=(d_inicio, d_fim))
+    assert cbd.get_ingest_watermark("BTCUSDT", "1d") == watermark
+
+    cbd.clean_kline_table(["1d"])
+    cbd.set_ingest_watermark("BTCUSDT", "1d", int((d_inicio - timedelta(days=1)).timestamp() * 1000))
+    loader.dump_klines_into_db("BTCUSDT", ["1d"], between_datetimes=(d_inicio, d_fim))
+    last = cbd.select_klines("BTCUSDT", "1d", returns="numpy")["open_time"].max()
+    assert cbd.get_ingest_watermark("BTCUSDT", "1d") == last
+
+
+@pytest.mark.delete_db_data
+def test_loader_must_insert_pages_downloaded_concurrently():
+    cbd = Database()
+    cbd.clean_kline_table(["1m"])
+
+    d_inicio = datetime(2025, 1, 1)
+    d_fim = datetime(2025, 1, 3, 2)
+    Loader(broker=cbn).dump_klines_into_db(
+        "BTCUSDT", ["1m"], between_datetimes=(d_inicio, d_fim), workers=3, max_pending=2
+    )
+    klines = cbd.select_klines("BTCUSDT", "1m", returns="numpy", cols=["open_time"])
+    assert len(klines) >= int((d_fim - d_inicio) / timedelta(minutes=1))
+    assert (np.diff(klines["open_time"]) == 60_000).all()
+    assert cbd.get_ingest_watermark("BTCUSDT", "1m") == klines["open_time"][-1]